@@ -1,26 +1,118 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from threading import Lock
 
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State
 
-from src.data.loader import load_data
+from src.data.cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_DISK_BYTES, AggregateCache
+from src.data.loader import dataset_version, load_waves
 from src.data.transforms import build_derived_tables
 from src.data.filters import build_filter_options
-from src.components.filter_panel import render_filter_panel
+from src.data.sampling import EXACT_MAX_ROWS, StratifiedSample
+from src.data.selection import SelectionStore
+from src.components.export_panel import (
+    EXPORT_LINK_IDS,
+    EXPORT_TABLE_ID,
+    render_export_panel,
+)
+from src.components.filter_panel import (
+    FILTER_IDS,
+    SELECTION_STORE_ID,
+    facet_options,
+    render_filter_panel,
+)
+from src.export import EXPORT_TABLES, export_formats, export_url, register_export
+from src.metrics import (
+    instrument,
+    register_cache_metrics,
+    register_metrics,
+    register_table_metrics,
+    stage,
+)
+from src.responses import register_compression
 from src.pages import overview, demographics, remote_work, org_support
 
 
-RAW_DF = load_data()
-DERIVED = build_derived_tables(RAW_DF)
+SURVEY_YEARS = tuple(
+    int(year) for year in os.environ.get("SURVEY_YEARS", "").split(",") if year.strip()
+)
+
+RAW_DF = load_waves(
+    years=SURVEY_YEARS or None,
+    mmap=os.environ.get("SURVEY_MMAP", "0") == "1",
+)
+DERIVED = build_derived_tables(RAW_DF, lazy=True)
 FILTER_OPTIONS = build_filter_options(DERIVED["base"])
+SELECTIONS = SelectionStore(DERIVED["base"])
+
+# With SURVEY_SAMPLE_ROWS set, selections larger than SURVEY_EXACT_MAX_ROWS
+# are aggregated on a stratified sample of that many respondents and their
+# KPIs carry 95% confidence intervals. Respondent counts stay exact.
+SAMPLE_ROWS = int(os.environ.get("SURVEY_SAMPLE_ROWS", "0"))
+SAMPLE = (
+    StratifiedSample(
+        DERIVED["base"],
+        rows=SAMPLE_ROWS,
+        exact_max_rows=int(os.environ.get("SURVEY_EXACT_MAX_ROWS", EXACT_MAX_ROWS)),
+    )
+    if 0 < SAMPLE_ROWS < len(DERIVED["base"])
+    else None
+)
+CACHE = AggregateCache(
+    dataset_version()
+    if SAMPLE is None
+    else f"{dataset_version()}:sample-{SAMPLE_ROWS}-{SAMPLE.exact_max_rows}",
+    max_bytes=int(os.environ.get("SURVEY_CACHE_BYTES", DEFAULT_MAX_BYTES)),
+    directory=os.environ.get("SURVEY_CACHE_DIR"),
+    max_disk_bytes=int(
+        os.environ.get("SURVEY_CACHE_DISK_BYTES", DEFAULT_MAX_DISK_BYTES)
+    ),
+)
+
+# Pages listed here render on a local process pool instead of the request
+# worker. The jobs are forked, so their aggregates only reach other requests
+# through SURVEY_CACHE_DIR.
+BACKGROUND_PAGES = {
+    page.strip()
+    for page in os.environ.get("SURVEY_BACKGROUND_PAGES", "").split(",")
+    if page.strip()
+}
+BACKGROUND_MANAGER = None
+if BACKGROUND_PAGES:
+    import diskcache
+
+    BACKGROUND_MANAGER = dash.DiskcacheManager(
+        diskcache.Cache(os.environ.get("SURVEY_BACKGROUND_DIR"))
+    )
 
 
 app = dash.Dash(
     __name__,
     suppress_callback_exceptions=True,
+    background_callback_manager=BACKGROUND_MANAGER,
     meta_tags=[{"name": "viewport", "content": "width=device-width, initial-scale=1"}],
 )
 server = app.server
+register_metrics(server)
+register_cache_metrics(CACHE)
+register_table_metrics(DERIVED)
+# Registered after the metrics hook so it runs first and payload sizes are
+# recorded as sent on the wire.
+if os.environ.get("SURVEY_GZIP", "1") != "0":
+    register_compression(server)
+register_export(server, DERIVED, SELECTIONS)
+
+
+@server.before_request
+def warm_derived_tables():
+    if os.environ.get("SURVEY_WARM_TABLES", "1") != "0":
+        DERIVED.warm_in_background()
+        if SAMPLE is not None:
+            SAMPLE.derived.warm_in_background()
+
 
 app.layout = html.Div(
     className="app-shell",
@@ -31,6 +123,7 @@ app.layout = html.Div(
                 html.H2("Remote Work Survey"),
                 html.P("Filter the results to explore patterns."),
                 render_filter_panel(FILTER_OPTIONS),
+                render_export_panel(EXPORT_TABLES, export_formats()),
             ],
         ),
         html.Div(
@@ -59,18 +152,120 @@ app.layout = html.Div(
 @app.callback(Output("tab-content", "children"), Input("tabs", "value"))
 def render_tab(tab_value):
     if tab_value == "demographics":
-        return demographics.layout()
+        return demographics.layout(DERIVED)
     if tab_value == "remote_work":
-        return remote_work.layout()
+        return remote_work.layout(DERIVED)
     if tab_value == "org_support":
-        return org_support.layout()
-    return overview.layout()
+        return org_support.layout(DERIVED)
+    return overview.layout(DERIVED)
+
+
+# Renders the tabs the user is not looking at after each filter change, so
+# switching to them is a render-cache hit. One thread keeps prefetching from
+# competing with itself. Each selection counts the sessions currently on it,
+# and a queued pass is abandoned once no session is left on its selection.
+PREFETCH = os.environ.get("SURVEY_PREFETCH", "0") == "1"
+PREFETCHER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+_selection_viewers = Counter()
+_viewers_lock = Lock()
+
+
+def prefetch_tabs(selection: dict, previous: dict | None, current_tab: str) -> None:
+    with _viewers_lock:
+        _selection_viewers[selection["key"]] += 1
+        left = (previous or {}).get("key")
+        # The previous selection may have been published by another worker.
+        if _selection_viewers.get(left, 0) > 0:
+            _selection_viewers[left] -= 1
+            if not _selection_viewers[left]:
+                del _selection_viewers[left]
+
+    def run():
+        for tab, rendered in RENDERERS.items():
+            if not _selection_viewers.get(selection["key"]):
+                return
+            if tab != current_tab:
+                rendered(selection)
+
+    PREFETCHER.submit(run)
+
+
+@app.callback(
+    Output(SELECTION_STORE_ID, "data"),
+    [Input(FILTER_IDS[key], "value") for key in FILTER_IDS],
+    State("tabs", "value"),
+    State(SELECTION_STORE_ID, "data"),
+)
+@instrument("resolve_selection")
+def resolve_selection(*values):
+    *values, current_tab, previous = values
+    with stage("filter"):
+        selection = SELECTIONS.publish(dict(zip(FILTER_IDS, values)), previous)
+    if PREFETCH:
+        prefetch_tabs(selection, previous, current_tab)
+    return selection
+
+
+@app.callback(
+    [Output(FILTER_IDS[key], "options") for key in FILTER_IDS],
+    Input(SELECTION_STORE_ID, "data"),
+)
+def update_filter_options(selection):
+    filters = (selection or {}).get("filters") or {}
+    counts = SELECTIONS.index.facet_counts(filters)
+    return [
+        facet_options(FILTER_OPTIONS[key], counts[key], filters.get(key))
+        for key in FILTER_IDS
+    ]
+
+
+@app.callback(
+    [Output(EXPORT_LINK_IDS[fmt], "href") for fmt in export_formats()],
+    Input(SELECTION_STORE_ID, "data"),
+    Input(EXPORT_TABLE_ID, "value"),
+)
+def update_export_links(selection, table):
+    filters = (selection or {}).get("filters")
+    return [
+        app.get_relative_path(export_url(table, fmt, filters))
+        for fmt in export_formats()
+    ]
+
+
+def background_for(page: str) -> dict | None:
+    if page not in BACKGROUND_PAGES:
+        return None
+    # A newer filter change already cancels the running job; leaving the tab
+    # cancels it too.
+    return {"cancel": [Input("tabs", "value")]}
 
 
-overview.register_callbacks(app, RAW_DF, DERIVED)
-demographics.register_callbacks(app, RAW_DF, DERIVED)
-remote_work.register_callbacks(app, RAW_DF, DERIVED)
-org_support.register_callbacks(app, RAW_DF, DERIVED)
+RENDERERS = {
+    "overview": overview.register_callbacks(
+        app, RAW_DF, DERIVED, SELECTIONS, CACHE, background_for("overview")
+    ),
+    "demographics": demographics.register_callbacks(
+        app,
+        RAW_DF,
+        DERIVED,
+        SELECTIONS,
+        CACHE,
+        background_for("demographics"),
+        sample=SAMPLE,
+    ),
+    "remote_work": remote_work.register_callbacks(
+        app, RAW_DF, DERIVED, SELECTIONS, CACHE, background_for("remote_work")
+    ),
+    "org_support": org_support.register_callbacks(
+        app,
+        RAW_DF,
+        DERIVED,
+        SELECTIONS,
+        CACHE,
+        background_for("org_support"),
+        sample=SAMPLE,
+    ),
+}
 
 
 if __name__ == "__main__":
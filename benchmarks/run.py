@@ -0,0 +1,411 @@
+import argparse
+import gzip
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.io.json as plotly_json
+
+from src.components import charts
+from src.data.filters import FilterIndex, apply_filters
+from src.data.loader import DEFAULT_DATA_PATH, SNAPSHOT_TAG, load_data
+from src.data.selection import SelectionStore
+from src.data.snapshot import write_snapshot
+from src.data.summaries import box_summary, box_summary_from_counts
+from src.data.synthetic import SurveyModel
+from src.data.transforms import PERIOD_ORDER, build_derived_tables, select_long
+from src.pages import demographics, org_support, overview, remote_work
+from src.responses import GZIP_LEVEL
+
+
+SCALES = [1, 10, 100, 1000]
+
+BOX_KEYS = ["gender", "period"]
+
+DEFAULT_REPEAT = 3
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "latest.json"
+
+# Writing a 1000x CSV costs gigabytes of disk for a number nobody deploys with,
+# so above this size only the snapshot load path is timed.
+MAX_CSV_ROWS = 250_000
+
+FILTER_STATES = {
+    "all": {},
+    "metro": {"location": ["Metro"]},
+    "metro_large_org": {"location": ["Metro"], "org_size": ["More than 200"]},
+    "female_male_25_34": {"gender": ["Female", "Male"], "age_group": ["25-34"]},
+    "no_match": {"gender": ["No such value"]},
+}
+
+# One dropdown click away from a previous selection, as a session explores.
+# Each side must select at least MIN_REFINE_ROWS rows per unit of scale.
+MIN_REFINE_ROWS = 20
+
+REFINE_STEPS = {
+    "add_field": (
+        {
+            "industry": ["Financial and Insurance Services"],
+            "org_size": ["More than 200"],
+        },
+        {
+            "industry": ["Financial and Insurance Services"],
+            "org_size": ["More than 200"],
+            "location": ["Metro"],
+        },
+    ),
+    "add_value": (
+        {"industry": ["Financial and Insurance Services"], "gender": ["Female"]},
+        {
+            "industry": ["Financial and Insurance Services", "Other Services"],
+            "gender": ["Female"],
+        },
+    ),
+    "remove_value": (
+        {"age_group": ["25-34", "35-44"], "location": ["Regional"]},
+        {"age_group": ["25-34"], "location": ["Regional"]},
+    ),
+    "remove_field": (
+        {"gender": ["Female"], "age_group": ["25-34"]},
+        {"gender": ["Female"]},
+    ),
+}
+
+PAGES = {
+    "overview": (overview, "update_overview"),
+    "demographics": (demographics, "update_demographics"),
+    "remote_work": (remote_work, "update_remote"),
+    "org_support": (org_support, "update_support"),
+}
+
+# The Remote Work tab sends the largest callback payload, so its responses are
+# also timed through Dash's JSON encoder and gzip.
+SERIALIZE_PAGE = "remote_work"
+
+CHARTS = {
+    "age_gender_patch": (
+        "overview",
+        lambda data, cube: charts.age_gender_patch(
+            data["age_gender"], cube.domain("gender")
+        ),
+    ),
+    "industry_treemap_patch": (
+        "overview",
+        lambda data, cube: charts.industry_treemap_patch(data["industry_counts"]),
+    ),
+    "orgsize_location_patch": (
+        "overview",
+        lambda data, cube: charts.orgsize_location_patch(
+            data["org_loc"], cube.domain("location")
+        ),
+    ),
+    "remote_pct_patch[gender]": (
+        "remote_work",
+        lambda data, cube: charts.remote_pct_patch(
+            data["remote_by_gender"], PERIOD_ORDER, "gender"
+        ),
+    ),
+    "remote_pct_patch[org_size]": (
+        "remote_work",
+        lambda data, cube: charts.remote_pct_patch(
+            data["remote_by_orgsize"], PERIOD_ORDER, "org_size"
+        ),
+    ),
+    "gap_patch": (
+        "remote_work",
+        lambda data, cube: charts.gap_patch(data["gap_summary"]),
+    ),
+    "org_support_patch": (
+        "org_support",
+        lambda data, cube: charts.org_support_patch(
+            data["support_summary"], org_support.QUESTIONS
+        ),
+    ),
+    "time_allocation_patch": (
+        "org_support",
+        lambda data, cube: charts.time_allocation_patch(
+            data["time_summary"], org_support.WORK_TYPES
+        ),
+    ),
+}
+
+
+class CallbackRecorder:
+    def __init__(self):
+        self.callbacks = {}
+
+    def callback(self, *args, **kwargs):
+        def register(func):
+            self.callbacks[func.__name__] = func
+            return func
+
+        return register
+
+
+class UncachedAggregates:
+    def __init__(self):
+        self.last = {}
+
+    def get(self, namespace: str, filters: dict | None):
+        return False, None
+
+    def put(self, namespace: str, filters: dict | None, value) -> None:
+        self.last[namespace] = value
+
+    def get_or_compute(self, namespace: str, filters: dict | None, compute):
+        value = compute()
+        self.put(namespace, filters, value)
+        return value
+
+
+def scale_frame(df: pd.DataFrame, factor: int, seed: int = 0) -> pd.DataFrame:
+    if factor == 1:
+        return df
+    model = SurveyModel.fit(df)
+    return model.sample(len(df) * factor, np.random.default_rng(seed))
+
+
+def timed(func, repeat: int) -> tuple[list[float], object]:
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 ** 2 if sys.platform == "darwin" else usage / 1024
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(base_df: pd.DataFrame, scale: int, repeat: int, workdir: Path) -> tuple:
+    df = scale_frame(base_df, scale)
+    results = []
+
+    def record(name, times, state=None, **extra):
+        results.append(
+            {
+                "scale": scale,
+                "rows": len(df),
+                "name": name,
+                "state": state,
+                "runs": len(times),
+                "min_s": min(times),
+                "median_s": statistics.median(times),
+                **extra,
+            }
+        )
+
+    source = workdir / f"scaled_{scale}.csv"
+    if len(df) <= MAX_CSV_ROWS:
+        df.to_csv(source, index=False, encoding="latin1")
+        times, _ = timed(
+            lambda: load_data.__wrapped__(source, use_snapshot=False), repeat
+        )
+        record("load_data[csv]", times)
+    else:
+        # The snapshot only needs a source file to fingerprint.
+        source.write_text("")
+    write_snapshot(df, source, tag=SNAPSHOT_TAG)
+    times, _ = timed(lambda: load_data.__wrapped__(source), repeat)
+    record("load_data[snapshot]", times)
+
+    times, derived = timed(lambda: build_derived_tables(df), repeat)
+    record("build_derived_tables", times)
+    base = derived["base"]
+    cube = derived["cube"]
+
+    times, index = timed(lambda: FilterIndex(base), repeat)
+    record("FilterIndex", times)
+    for state, filters in FILTER_STATES.items():
+        times, _ = timed(lambda: apply_filters(base, filters), repeat)
+        record("apply_filters[scan]", times, state)
+        times, _ = timed(lambda: apply_filters(base, filters, index), repeat)
+        record("apply_filters[index]", times, state)
+        times, _ = timed(lambda: index.facet_counts(filters), repeat)
+        record("FilterIndex.facet_counts", times, state)
+    for state, (previous, filters) in REFINE_STEPS.items():
+        sizes = (index.count(previous), index.count(filters))
+        # A step between empty or identical selections times nothing useful.
+        if min(sizes) < MIN_REFINE_ROWS * scale or sizes[0] == sizes[1]:
+            raise ValueError(f"refine step {state} selects {sizes[0]} -> {sizes[1]}")
+        positions = index.positions(previous)
+
+        def step():
+            refined = index.refine(previous, positions, filters)
+            return index.positions(filters) if refined is None else refined
+
+        times, _ = timed(step, repeat)
+        record("FilterIndex.refine", times, state)
+        times, _ = timed(lambda: index.positions(filters), repeat)
+        record("FilterIndex.positions", times, state)
+
+    remote_long, histogram = derived["remote_long"], derived["histograms"]["remote_long"]
+    for state, filters in FILTER_STATES.items():
+        positions = index.positions(filters)
+        times, _ = timed(
+            lambda: box_summary(
+                select_long(remote_long, derived["row_offsets"]["remote_long"], positions),
+                BOX_KEYS,
+                "remote_pct",
+            ),
+            repeat,
+        )
+        record("box_summary[rows]", times, state)
+        times, _ = timed(
+            lambda: box_summary_from_counts(
+                histogram.counts_by(BOX_KEYS, filters), BOX_KEYS, "remote_pct"
+            ),
+            repeat,
+        )
+        record("box_summary[histogram]", times, state)
+
+    selections = SelectionStore(base, index)
+    aggregates, updates = {}, {}
+    for page, (module, name) in PAGES.items():
+        times, _ = timed(lambda: module.layout(derived), repeat)
+        record(f"layout[{page}]", times)
+        recorder = CallbackRecorder()
+        aggregates[page] = UncachedAggregates()
+        module.register_callbacks(recorder, df, derived, selections, aggregates[page])
+        updates[page] = recorder.callbacks[name]
+
+    for state, filters in FILTER_STATES.items():
+        selection = selections.publish(filters)
+        for page, (module, name) in PAGES.items():
+            update = updates[page]
+            times, response = timed(lambda: update(selection), repeat)
+            record(
+                name,
+                times,
+                state,
+                bytes=len(plotly_json.to_json_plotly(response)),
+            )
+            if page != SERIALIZE_PAGE:
+                continue
+            times, body = timed(lambda: plotly_json.to_json_plotly(response), repeat)
+            record("serialize[plotly]", times, state, bytes=len(body))
+            payload = body.encode()
+            times, body = timed(lambda: gzip.compress(payload, GZIP_LEVEL), repeat)
+            record("gzip", times, state, bytes=len(body))
+        for name, (page, build) in CHARTS.items():
+            data = aggregates[page].last[page]
+            times, figure = timed(lambda: build(data, cube), repeat)
+            record(name, times, state, bytes=len(plotly_json.to_json_plotly(figure)))
+
+    summary = {"scale": scale, "rows": len(df), "peak_rss_mb": round(peak_rss_mb(), 1)}
+    return results, summary
+
+
+def compare(
+    results: list, baseline_path: Path, threshold: float, min_delta_s: float
+) -> list:
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    previous = {
+        (r["scale"], r["name"], r["state"]): r["median_s"] for r in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        before = previous.get((result["scale"], result["name"], result["state"]))
+        if (
+            before
+            and result["median_s"] > before * threshold
+            and result["median_s"] - before > min_delta_s
+        ):
+            regressions.append({**result, "baseline_median_s": before})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time the data and callback hot paths on scaled survey data."
+    )
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    base_df = load_data(args.data, use_snapshot=False)
+    results, scales = [], []
+    with tempfile.TemporaryDirectory(prefix="survey-bench-") as workdir:
+        for scale in args.scales:
+            scale_results, summary = run_scale(
+                base_df, scale, args.repeat, Path(workdir)
+            )
+            results.extend(scale_results)
+            scales.append(summary)
+            print(
+                f"{scale:>5}x {summary['rows']:>10,} rows "
+                f"peak RSS {summary['peak_rss_mb']:>8.1f} MB"
+            )
+            for result in scale_results:
+                print(
+                    f"       {result['name']:<28} {result['state'] or '':<18} "
+                    f"{result['median_s'] * 1000:>10.2f} ms"
+                    + (f" {result['bytes']:>10,} B" if "bytes" in result else "")
+                )
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "source": str(args.data),
+            "source_rows": len(base_df),
+            "repeat": args.repeat,
+        },
+        "scales": scales,
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(
+            results, args.compare, args.threshold, args.min_delta_ms / 1000
+        )
+        for result in regressions:
+            print(
+                f"REGRESSION {result['scale']}x {result['name']} {result['state'] or ''}: "
+                f"{result['baseline_median_s'] * 1000:.2f} ms -> "
+                f"{result['median_s'] * 1000:.2f} ms"
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
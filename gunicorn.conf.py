@@ -0,0 +1,23 @@
+import gc
+import os
+
+
+# Build the dataset once in the master; forked workers share its NumPy buffers
+# copy-on-write instead of each loading their own copy.
+preload_app = os.environ.get("SURVEY_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import app
+
+    app.DERIVED.warm()
+    if app.SAMPLE is not None:
+        app.SAMPLE.derived.warm()
+    # Keep the collector from touching (and so copying) the preloaded objects.
+    gc.freeze()
+
+# Exports stream for as long as the download takes; with threads a download
+# ties up one thread of a worker instead of the whole worker.
+threads = int(os.environ.get("SURVEY_WORKER_THREADS", "4"))
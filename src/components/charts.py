@@ -1,88 +1,270 @@
 import plotly.express as px
 import plotly.graph_objects as go
+from dash import Patch
 
 
-EMPTY_FIG = go.Figure()
+COLORS = px.colors.qualitative.Plotly
 
 
-def empty_chart(title: str) -> go.Figure:
-    fig = EMPTY_FIG.copy()
-    fig.update_layout(title=title)
-    return fig
+def _color(index: int) -> str:
+    return COLORS[index % len(COLORS)]
 
 
-def age_gender_bar(df):
+def _groups(df, field) -> dict:
     if df is None or df.empty:
-        return empty_chart("Age by Gender")
-    return px.bar(
-        df,
-        x="age_group",
-        y="count",
-        color="gender",
-        barmode="stack",
-        title="Age Distribution by Gender",
-        labels={"age_group": "Age Group", "count": "Respondents", "gender": "Gender"},
+        return {}
+    return {
+        str(name): group
+        for name, group in df.groupby(field, observed=True, sort=False)
+    }
+
+
+def _titled(patch: Patch, has_data: bool, title: str, empty_title: str) -> Patch:
+    patch["layout"]["title"]["text"] = title if has_data else empty_title
+    return patch
+
+
+# Figures are built once per tab render with one trace per series in the
+# domain; filter changes then only patch the trace arrays and the title.
+
+
+def bar_skeleton(series, x, y, color, title, labels, barmode="stack") -> go.Figure:
+    fig = go.Figure(
+        [
+            go.Bar(
+                name=str(name),
+                x=[],
+                y=[],
+                marker_color=_color(i),
+                legendgroup=str(name),
+                hovertemplate=(
+                    f"{labels[color]}={name}<br>{labels[x]}=%{{x}}<br>"
+                    f"{labels[y]}=%{{y}}<extra></extra>"
+                ),
+            )
+            for i, name in enumerate(series)
+        ]
     )
+    fig.update_layout(
+        title=title,
+        barmode=barmode,
+        xaxis_title=labels[x],
+        yaxis_title=labels[y],
+        legend_title_text=labels[color],
+    )
+    return fig
 
 
-def industry_treemap(df):
-    if df is None or df.empty:
-        return empty_chart("Industry Breakdown")
-    fig = px.treemap(
+def series_patch(df, series, x, y, color, title, empty_title) -> Patch:
+    patch = Patch()
+    groups = _groups(df, color)
+    for i, name in enumerate(series):
+        group = groups.get(str(name))
+        patch["data"][i]["x"] = [] if group is None else group[x].astype(str).tolist()
+        patch["data"][i]["y"] = [] if group is None else group[y].tolist()
+    return _titled(patch, bool(groups), title, empty_title)
+
+
+AGE_GENDER_LABELS = {"age_group": "Age Group", "count": "Respondents", "gender": "Gender"}
+
+
+def age_gender_bar(genders) -> go.Figure:
+    return bar_skeleton(
+        genders,
+        "age_group",
+        "count",
+        "gender",
+        "Age Distribution by Gender",
+        AGE_GENDER_LABELS,
+    )
+
+
+def age_gender_patch(df, genders) -> Patch:
+    return series_patch(
         df,
-        path=["industry", "industry_detailed"],
-        values="count",
-        title="Industry Distribution",
-    )
-    fig.update_traces(
-        hovertemplate=(
-            "<b>%{label}</b><br>"
-            "Respondents: %{value}<br>"
-            "Share of sample: %{customdata[0]:.1f}%<extra></extra>"
-        ),
-        customdata=df[["percent"]].to_numpy(),
+        genders,
+        "age_group",
+        "count",
+        "gender",
+        "Age Distribution by Gender",
+        "Age by Gender",
+    )
+
+
+def industry_treemap() -> go.Figure:
+    fig = go.Figure(
+        go.Treemap(
+            ids=[],
+            labels=[],
+            parents=[],
+            values=[],
+            branchvalues="total",
+            hovertemplate=(
+                "<b>%{label}</b><br>"
+                "Respondents: %{value}<br>"
+                "Share of sample: %{customdata[0]:.1f}%<extra></extra>"
+            ),
+        )
     )
+    fig.update_layout(title="Industry Distribution")
     return fig
 
 
-def orgsize_location_bar(df):
-    if df is None or df.empty:
-        return empty_chart("Org Size by Location")
-    return px.bar(
-        df,
-        x="org_size",
-        y="count",
-        color="location",
-        barmode="stack",
-        title="Company Size by Location",
-        labels={"org_size": "Company Size", "count": "Respondents", "location": "Location"},
+def industry_treemap_patch(df) -> Patch:
+    patch = Patch()
+    has_data = df is not None and not df.empty
+    ids, labels, parents, values, customdata = [], [], [], [], []
+    if has_data:
+        industry = df["industry"].astype(str)
+        detailed = df["industry_detailed"].astype(str)
+        totals = df.groupby(industry, sort=False)[["count", "percent"]].sum()
+        ids = (industry + "/" + detailed).tolist() + totals.index.tolist()
+        labels = detailed.tolist() + totals.index.tolist()
+        parents = industry.tolist() + [""] * len(totals)
+        values = df["count"].tolist() + totals["count"].tolist()
+        customdata = [[p] for p in df["percent"].tolist() + totals["percent"].tolist()]
+    trace = patch["data"][0]
+    trace["ids"] = ids
+    trace["labels"] = labels
+    trace["parents"] = parents
+    trace["values"] = values
+    trace["customdata"] = customdata
+    return _titled(patch, has_data, "Industry Distribution", "Industry Breakdown")
+
+
+ORGSIZE_LOCATION_LABELS = {
+    "org_size": "Company Size",
+    "count": "Respondents",
+    "location": "Location",
+}
+
+
+def orgsize_location_bar(locations) -> go.Figure:
+    return bar_skeleton(
+        locations,
+        "org_size",
+        "count",
+        "location",
+        "Company Size by Location",
+        ORGSIZE_LOCATION_LABELS,
     )
 
 
-def remote_pct_box(df, x_field):
-    if df is None or df.empty:
-        return empty_chart("Remote Work %")
-    return px.box(
+def orgsize_location_patch(df, locations) -> Patch:
+    return series_patch(
         df,
-        x=x_field,
-        y="remote_pct",
-        color="period",
-        points="all",
-        title=f"Remote Work % by {x_field.replace('_', ' ').title()}",
-        labels={x_field: x_field.replace("_", " ").title(), "remote_pct": "Remote Work %"},
+        locations,
+        "org_size",
+        "count",
+        "location",
+        "Company Size by Location",
+        "Org Size by Location",
     )
 
 
-def gap_box(df):
-    if df is None or df.empty:
-        return empty_chart("Preference Gaps")
-    fig = px.box(
-        df,
-        x="period_gap",
-        y="gap",
-        points=False,
-        title="Remote Work Preference Gaps",
-        labels={"period_gap": "Gap Type", "gap": "Preferred - Actual (%)"},
+def summary_box(series, x_title, y_title, title, legend_title=None) -> go.Figure:
+    fig = go.Figure()
+    for i, name in enumerate(series):
+        color = _color(i)
+        group = None if name is None else str(name)
+        fig.add_trace(
+            go.Box(
+                name=group,
+                x=[],
+                q1=[],
+                median=[],
+                q3=[],
+                lowerfence=[],
+                upperfence=[],
+                boxpoints=False,
+                marker_color=color,
+                offsetgroup=group,
+                legendgroup=group,
+                showlegend=group is not None,
+            )
+        )
+        # A transparent box carrying only the outliers and the jitter sample,
+        # stacked on the precomputed box of the same group.
+        fig.add_trace(
+            go.Box(
+                name=group,
+                x=[],
+                y=[],
+                boxpoints="all",
+                jitter=0.3,
+                pointpos=0,
+                fillcolor="rgba(0,0,0,0)",
+                line={"width": 0},
+                hoveron="points",
+                marker_color=color,
+                offsetgroup=group,
+                legendgroup=group,
+                showlegend=False,
+            )
+        )
+    fig.update_layout(
+        title=title,
+        boxmode="group",
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        legend_title_text=legend_title,
+    )
+    return fig
+
+
+def summary_box_patch(
+    summary, series, x_field, value, color_field, title, empty_title
+) -> Patch:
+    patch = Patch()
+    if summary is None:
+        stats, points = {}, {}
+    elif color_field is None:
+        stats, points = {None: summary["stats"]}, {None: summary["points"]}
+    else:
+        stats = _groups(summary["stats"], color_field)
+        points = _groups(summary["points"], color_field)
+    for i, name in enumerate(series):
+        key = None if name is None else str(name)
+        box, box_points = patch["data"][2 * i], patch["data"][2 * i + 1]
+        group = stats.get(key)
+        box["x"] = [] if group is None else group[x_field].astype(str).tolist()
+        for field in ("q1", "median", "q3", "lowerfence", "upperfence"):
+            box[field] = [] if group is None else group[field].tolist()
+        group = points.get(key)
+        box_points["x"] = [] if group is None else group[x_field].astype(str).tolist()
+        box_points["y"] = [] if group is None else group[value].tolist()
+    return _titled(patch, bool(stats), title, empty_title)
+
+
+def _remote_pct_title(x_field: str) -> str:
+    return f"Remote Work % by {x_field.replace('_', ' ').title()}"
+
+
+def remote_pct_box(periods, x_field) -> go.Figure:
+    return summary_box(
+        periods,
+        x_field.replace("_", " ").title(),
+        "Remote Work %",
+        _remote_pct_title(x_field),
+        legend_title="period",
+    )
+
+
+def remote_pct_patch(summary, periods, x_field) -> Patch:
+    return summary_box_patch(
+        summary,
+        periods,
+        x_field,
+        "remote_pct",
+        "period",
+        _remote_pct_title(x_field),
+        "Remote Work %",
+    )
+
+
+def gap_box() -> go.Figure:
+    fig = summary_box(
+        [None], "Gap Type", "Preferred - Actual (%)", "Remote Work Preference Gaps"
     )
     fig.update_xaxes(
         categoryorder="array",
@@ -91,17 +273,41 @@ def gap_box(df):
     return fig
 
 
-def org_support_trends(df):
-    if df is None or df.empty:
-        return empty_chart("Org Support Over Time")
-    fig = px.line(
-        df,
-        x="period",
-        y="score",
-        color="question",
-        markers=True,
+def gap_patch(summary) -> Patch:
+    return summary_box_patch(
+        summary,
+        [None],
+        "period_gap",
+        "gap",
+        None,
+        "Remote Work Preference Gaps",
+        "Preference Gaps",
+    )
+
+
+def org_support_trends(questions) -> go.Figure:
+    fig = go.Figure(
+        [
+            go.Scatter(
+                name=str(question),
+                x=[],
+                y=[],
+                mode="lines+markers",
+                line_color=_color(i),
+                legendgroup=str(question),
+                hovertemplate=(
+                    f"question={question}<br>period=%{{x}}<br>"
+                    "Average score (1-5)=%{y}<extra></extra>"
+                ),
+            )
+            for i, question in enumerate(questions)
+        ]
+    )
+    fig.update_layout(
         title="Organization Support Over Time",
-        labels={"score": "Average score (1-5)"},
+        xaxis_title="period",
+        yaxis_title="Average score (1-5)",
+        legend_title_text="question",
     )
     fig.update_xaxes(
         categoryorder="array",
@@ -110,15 +316,40 @@ def org_support_trends(df):
     return fig
 
 
-def time_allocation_bar(df):
-    if df is None or df.empty:
-        return empty_chart("Time Allocation")
-    return px.bar(
+def org_support_patch(df, questions) -> Patch:
+    return series_patch(
         df,
-        x="activity",
-        y="hours",
-        color="work_type",
+        questions,
+        "period",
+        "score",
+        "question",
+        "Organization Support Over Time",
+        "Org Support Over Time",
+    )
+
+
+TIME_ALLOCATION_LABELS = {"activity": "Activity", "hours": "Hours", "work_type": "work_type"}
+
+
+def time_allocation_bar(work_types) -> go.Figure:
+    return bar_skeleton(
+        work_types,
+        "activity",
+        "hours",
+        "work_type",
+        "Average Hours per Activity",
+        TIME_ALLOCATION_LABELS,
         barmode="group",
-        title="Average Hours per Activity",
-        labels={"activity": "Activity", "hours": "Hours"},
+    )
+
+
+def time_allocation_patch(df, work_types) -> Patch:
+    return series_patch(
+        df,
+        work_types,
+        "activity",
+        "hours",
+        "work_type",
+        "Average Hours per Activity",
+        "Time Allocation",
     )
@@ -0,0 +1,29 @@
+from dash import html, dcc
+
+
+EXPORT_TABLE_ID = "export-table"
+EXPORT_LINK_IDS = {"csv": "export-csv", "parquet": "export-parquet"}
+
+
+def render_export_panel(tables: dict, formats: list[str]) -> html.Div:
+    return html.Div(
+        className="export-panel filter-group",
+        children=[
+            html.Label("Download Rows"),
+            dcc.Dropdown(
+                id=EXPORT_TABLE_ID,
+                options=[
+                    {"label": label, "value": table} for table, label in tables.items()
+                ],
+                value=next(iter(tables)),
+                clearable=False,
+            ),
+            html.Div(
+                className="export-links",
+                children=[
+                    html.A(fmt.upper(), id=EXPORT_LINK_IDS[fmt], download="")
+                    for fmt in formats
+                ],
+            ),
+        ],
+    )
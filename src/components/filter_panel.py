@@ -2,6 +2,7 @@ from dash import html, dcc
 
 
 FILTER_IDS = {
+    "survey_year": "filter-survey-year",
     "gender": "filter-gender",
     "age_group": "filter-age-group",
     "industry": "filter-industry",
@@ -9,11 +10,41 @@ FILTER_IDS = {
     "location": "filter-location",
 }
 
+SELECTION_STORE_ID = "filter-selection"
+
+
+def facet_options(values: list, counts: dict, selected: list | None) -> list[dict]:
+    selected = {str(v) for v in selected or []}
+    return [
+        {
+            "label": f"{value} ({counts.get(value, 0):,})",
+            "value": value,
+            "disabled": not counts.get(value, 0) and value not in selected,
+        }
+        for value in values
+    ]
+
 
 def render_filter_panel(options: dict) -> html.Div:
     return html.Div(
         className="filter-panel",
         children=[
+            dcc.Store(id=SELECTION_STORE_ID),
+            html.Div(
+                className="filter-group",
+                children=[
+                    html.Label("Survey Year"),
+                    dcc.Dropdown(
+                        id=FILTER_IDS["survey_year"],
+                        options=[
+                            {"label": v, "value": v}
+                            for v in options.get("survey_year", [])
+                        ],
+                        multi=True,
+                        placeholder="All",
+                    ),
+                ],
+            ),
             html.Div(
                 className="filter-group",
                 children=[
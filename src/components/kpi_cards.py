@@ -1,16 +1,29 @@
+import pandas as pd
 from dash import html
 
 
-def kpi_row(kpis: list[tuple[str, str]]) -> html.Div:
+def interval_note(interval: tuple | None, spec: str) -> str | None:
+    if interval is None:
+        return None
+    low, high = interval
+    return f"95% CI {low:{spec}} to {high:{spec}}"
+
+
+def kpi_number(value, template: str) -> str:
+    # A selection in which nobody answered has no average or median.
+    if value is None or pd.isna(value):
+        return "N/A"
+    return template.format(value)
+
+
+def kpi_row(kpis: list[tuple]) -> html.Div:
     cards = []
-    for label, value in kpis:
-        cards.append(
-            html.Div(
-                className="kpi-card",
-                children=[
-                    html.Div(label, className="kpi-label"),
-                    html.Div(value, className="kpi-value"),
-                ],
-            )
-        )
+    for label, value, *note in kpis:
+        children = [
+            html.Div(label, className="kpi-label"),
+            html.Div(value, className="kpi-value"),
+        ]
+        if note and note[0]:
+            children.append(html.Div(note[0], className="kpi-note"))
+        cards.append(html.Div(className="kpi-card", children=children))
     return html.Div(cards, className="kpi-row")
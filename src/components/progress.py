@@ -0,0 +1,24 @@
+from dash import Output, html
+
+
+HIDDEN = {"display": "none"}
+SHOWN = {"display": "block"}
+
+# How often the browser polls a running background job for its result.
+POLL_INTERVAL_MS = 250
+
+
+def progress_bar(component_id: str) -> html.Progress:
+    # Without a value the browser draws an indeterminate bar.
+    return html.Progress(id=component_id, className="callback-progress", style=HIDDEN)
+
+
+def background_options(progress_id: str, background: dict | None) -> dict:
+    if background is None:
+        return {}
+    return {
+        "background": True,
+        "interval": POLL_INTERVAL_MS,
+        "running": [(Output(progress_id, "style"), SHOWN, HIDDEN)],
+        **background,
+    }
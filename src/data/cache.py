@@ -0,0 +1,225 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from src.data.filters import filter_key
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# The disk tier is shared by every worker and outlives restarts, so it gets a
+# budget of its own; pruning drops the least recently used files until the
+# directory is back under PRUNE_TARGET of it.
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+PRUNE_TARGET = 0.75
+
+
+CELL_BYTES = 8
+SCALARS = (int, float, str, bytes, type(None))
+
+SOURCE_ROOT = Path(__file__).resolve().parents[1]
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    # Cached values are whatever the page code returned, so any change to it
+    # may change their shape; a digest of the sources keys them apart.
+    digest = hashlib.sha256()
+    for path in sorted(SOURCE_ROOT.rglob("*.py")):
+        digest.update(path.relative_to(SOURCE_ROOT).as_posix().encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def estimate_size(value, seen: dict | None = None) -> int:
+    # Approximate in-memory footprint for the LRU budget; a pickle's length
+    # understates it several times over for chart outputs.
+    if isinstance(value, SCALARS):
+        return sys.getsizeof(value)
+    # Holds the objects too, so ids of temporaries are not reused mid-walk.
+    seen = {} if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen[id(value)] = value
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        # pandas' own memory_usage costs more than pickling a small frame;
+        # a word per cell is close enough for a budget.
+        return CELL_BYTES * (value.size + len(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = [*value.keys(), *value.values()]
+    elif isinstance(value, (list, tuple)):
+        # Chart patches carry long lists of plain numbers and labels.
+        if value and isinstance(value[0], SCALARS):
+            return size + len(value) * sys.getsizeof(value[0])
+        items = value
+    elif isinstance(value, (set, frozenset)):
+        items = value
+    elif hasattr(value, "to_plotly_json"):
+        # Dash components and patches; their attributes also carry the
+        # component's whole property list.
+        items = [value.to_plotly_json()]
+    else:
+        items = list(getattr(value, "__dict__", {}).values())
+    return size + sum(estimate_size(item, seen) for item in items)
+
+
+class AggregateCache:
+    def __init__(
+        self,
+        version: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        directory: Path | None = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ):
+        self.version = version
+        self.code_version = code_version()
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = Path(directory) if directory else None
+        self.disk_bytes = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self._disk_files())
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def key(self, namespace: str, filters: dict | None) -> str:
+        return f"{self.version}:{self.code_version}:{namespace}:{filter_key(filters)}"
+
+    def _disk_path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.pkl"
+
+    def _disk_files(self) -> list[tuple]:
+        files = []
+        for path in self.directory.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _prune_disk(self) -> None:
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes * PRUNE_TARGET:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        with self._lock:
+            self.disk_bytes = total
+
+    def _read_disk(self, key: str) -> tuple:
+        if self.directory is None:
+            return False, None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as handle:
+                payload = handle.read()
+            # The mtime doubles as the last use for pruning.
+            os.utime(path)
+        except OSError:
+            return False, None
+        try:
+            stored_key, value = pickle.loads(payload)
+        except Exception:
+            # A writer killed mid-write or a pickle from other library
+            # versions; drop it and recompute.
+            self._disk_path(key).unlink(missing_ok=True)
+            return False, None
+        if stored_key != key:
+            return False, None
+        return True, value
+
+    def _write_disk(self, key: str, payload: bytes) -> None:
+        path = self._disk_path(key)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload)
+            os.replace(tmp, path)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+            return
+        with self._lock:
+            self.disk_bytes += len(payload) - replaced
+            over = self.disk_bytes > self.max_disk_bytes
+        if over:
+            self._prune_disk()
+
+    def _remember(self, key: str, value, size: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def get(self, namespace: str, filters: dict | None):
+        key = self.key(namespace, filters)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key][0]
+        found, value = self._read_disk(key)
+        if not found:
+            with self._lock:
+                self.misses += 1
+            return False, None
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(key, value, estimate_size(value))
+        return True, value
+
+    def put(self, namespace: str, filters: dict | None, value) -> None:
+        key = self.key(namespace, filters)
+        self._remember(key, value, estimate_size(value))
+        if self.directory is not None:
+            self._write_disk(
+                key, pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+            )
+
+    def get_or_compute(self, namespace: str, filters: dict | None, compute):
+        found, value = self.get(namespace, filters)
+        if not found:
+            value = compute()
+            self.put(namespace, filters, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "disk_bytes": self.disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.data.filters import FILTER_FIELDS, _coerce_list
+
+
+CUBE_MEASURES = [
+    "remote_work_pct_last_year",
+    "remote_work_pct_last_3_months",
+    "remote_work_pref_pct_future",
+]
+
+# Detail columns are kept off the dense axes: crossing one with every filter
+# axis would multiply the cube by its label count. Their counts are stored
+# sparsely instead, as the (cell, detail) pairs that actually occur.
+PAIR_FIELDS = {"industry": "industry_detailed"}
+
+
+def _factorize(column: pd.Series) -> tuple:
+    codes, uniques = pd.factorize(column, sort=True)
+    # The last slot holds rows with a missing value.
+    return np.where(codes < 0, len(uniques), codes), uniques
+
+
+class DataCube:
+    def __init__(self, df: pd.DataFrame, measures: list[str] | None = None):
+        self.axes = []
+        self.labels = {}
+        codes = []
+        for key, col in FILTER_FIELDS.items():
+            if col not in df.columns:
+                continue
+            axis_codes, self.labels[key] = _factorize(df[col])
+            self.axes.append(key)
+            codes.append(axis_codes)
+
+        self.shape = tuple(len(self.labels[key]) + 1 for key in self.axes)
+        size = int(np.prod(self.shape))
+        flat = (
+            np.ravel_multi_index(codes, self.shape)
+            if codes
+            else np.zeros(len(df), dtype=np.intp)
+        )
+        self.counts = np.bincount(flat, minlength=size).reshape(self.shape)
+
+        self.details = {}
+        for key, detail in PAIR_FIELDS.items():
+            if key not in self.axes or detail not in df.columns:
+                continue
+            detail_codes, self.labels[detail] = _factorize(df[detail])
+            width = len(self.labels[detail]) + 1
+            pairs, pair_counts = np.unique(
+                flat.astype(np.int64) * width + detail_codes, return_counts=True
+            )
+            cells = np.unravel_index(pairs // width, self.shape)
+            pair_codes = dict(zip(self.axes, cells))
+            pair_codes[detail] = pairs % width
+            self.details[detail] = (pair_codes, pair_counts)
+
+        self.n = {}
+        self.sums = {}
+        self.sumsq = {}
+        for measure in measures if measures is not None else CUBE_MEASURES:
+            if measure not in df.columns:
+                continue
+            values = pd.to_numeric(df[measure], errors="coerce").to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            cells, values = flat[present], values[present]
+            self.n[measure] = np.bincount(cells, minlength=size).reshape(self.shape)
+            self.sums[measure] = np.bincount(
+                cells, weights=values, minlength=size
+            ).reshape(self.shape)
+            self.sumsq[measure] = np.bincount(
+                cells, weights=values * values, minlength=size
+            ).reshape(self.shape)
+
+    def domain(self, key: str) -> list[str]:
+        return [str(v) for v in self.labels.get(key, [])]
+
+    def _indices(self, filters: dict | None) -> list[np.ndarray | None]:
+        # None marks an axis the filters leave whole.
+        indices = []
+        for key in self.axes:
+            values = {str(v) for v in _coerce_list((filters or {}).get(key))}
+            if not values:
+                indices.append(None)
+                continue
+            labels = np.asarray(self.labels[key], dtype=object).astype(str)
+            indices.append(np.flatnonzero(np.isin(labels, list(values))))
+        return indices
+
+    def _reduce(self, array: np.ndarray, indices: list, keep: tuple = ()) -> np.ndarray:
+        # Summing the whole axes away first leaves np.take little to copy.
+        whole = tuple(
+            i for i, index in enumerate(indices) if index is None and i not in keep
+        )
+        array = array.sum(axis=whole, keepdims=True)
+        for i, index in enumerate(indices):
+            if index is not None:
+                array = np.take(array, index, axis=i)
+        return array.sum(axis=tuple(i for i in range(len(indices)) if i not in keep))
+
+    def total(self, filters: dict | None = None) -> int:
+        return int(self._reduce(self.counts, self._indices(filters)))
+
+    def moments(self, measure: str, filters: dict | None = None) -> tuple:
+        indices = self._indices(filters)
+        n = self._reduce(self.n[measure], indices)
+        if n == 0:
+            return 0, np.nan, np.nan
+        mean = self._reduce(self.sums[measure], indices) / n
+        var = self._reduce(self.sumsq[measure], indices) / n - mean * mean
+        return int(n), float(mean), float(max(var, 0.0))
+
+    def mean(self, measure: str, filters: dict | None = None) -> float:
+        if measure not in self.n:
+            return np.nan
+        return self.moments(measure, filters)[1]
+
+    def _dense_counts(self, fields: list[str], filters: dict | None) -> tuple:
+        indices = self._indices(filters)
+        positions = sorted(self.axes.index(field) for field in fields)
+        reduced = self._reduce(self.counts, indices, keep=tuple(positions))
+        cells = np.nonzero(reduced)
+        slots = {}
+        for cell, position in zip(cells, positions):
+            index = indices[position]
+            slots[self.axes[position]] = cell if index is None else index[cell]
+        return slots, reduced[cells]
+
+    def _sparse_counts(
+        self, detail: str, fields: list[str], filters: dict | None
+    ) -> tuple:
+        codes, counts = self.details[detail]
+        selected = np.ones(len(counts), dtype=bool)
+        for key, index in zip(self.axes, self._indices(filters)):
+            if index is not None:
+                allowed = np.zeros(len(self.labels[key]) + 1, dtype=bool)
+                allowed[index] = True
+                selected &= allowed[codes[key]]
+        shape = [len(self.labels[field]) + 1 for field in fields]
+        merged = np.bincount(
+            np.ravel_multi_index([codes[field][selected] for field in fields], shape),
+            weights=counts[selected],
+            minlength=int(np.prod(shape)),
+        )
+        present = np.flatnonzero(merged)
+        return dict(zip(fields, np.unravel_index(present, shape))), merged[present]
+
+    def counts_by(self, fields: list[str], filters: dict | None = None) -> pd.DataFrame:
+        detail = next((field for field in fields if field in self.details), None)
+        slots, counts = (
+            self._dense_counts(fields, filters)
+            if detail is None
+            else self._sparse_counts(detail, fields, filters)
+        )
+        # Drop the missing-value slots, as a dropna() before groupby would.
+        present = np.ones(len(counts), dtype=bool)
+        for field in fields:
+            present &= slots[field] < len(self.labels[field])
+        columns = {
+            field: self.labels[field].take(slots[field][present]) for field in fields
+        }
+        frame = pd.DataFrame(columns)
+        frame["count"] = counts[present].astype(np.int64)
+        return (
+            frame.groupby(fields, observed=True, sort=True)["count"]
+            .sum()
+            .reset_index()
+        )
+
+
+def build_cube(df: pd.DataFrame) -> DataCube:
+    return DataCube(df)
@@ -1,7 +1,11 @@
+import json
+
+import numpy as np
 import pandas as pd
 
 
 FILTER_FIELDS = {
+    "survey_year": "survey_year",
     "gender": "gender",
     "age_group": "age_group",
     "industry": "industry",
@@ -9,6 +13,13 @@ FILTER_FIELDS = {
     "location": "location",
 }
 
+PARTITION_FIELD = "survey_year"
+
+# Narrowing a previous selection tests each of its rows and widening one
+# unpacks only the bitmap bytes it adds; either stops paying off against a
+# fresh scan once it touches this share of the index.
+REFINE_MAX_FRACTION = 0.25
+
 
 def build_filter_options(df: pd.DataFrame) -> dict:
     options = {}
@@ -36,10 +47,224 @@ def _coerce_list(value):
     return [value]
 
 
-def apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
+def canonical_filters(filters: dict | None) -> dict:
+    canonical = {}
+    for key in FILTER_FIELDS:
+        values = sorted({str(v) for v in _coerce_list((filters or {}).get(key))})
+        if values:
+            canonical[key] = values
+    return canonical
+
+
+def filter_key(filters: dict | None) -> str:
+    return json.dumps(canonical_filters(filters), sort_keys=True, separators=(",", ":"))
+
+
+def partition_ranges(df: pd.DataFrame) -> list[tuple]:
+    if PARTITION_FIELD not in df.columns or not len(df):
+        return [(None, 0, len(df))]
+    values = df[PARTITION_FIELD].to_numpy()
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    stops = np.r_[starts[1:], len(values)]
+    return [(str(values[s]), int(s), int(e)) for s, e in zip(starts, stops)]
+
+
+class PartitionIndex:
+    def __init__(self, df: pd.DataFrame, label: str | None, start: int, stop: int):
+        self.label = label
+        self.start = start
+        self.stop = stop
+        self.size = stop - start
+        self.bitmaps = {}
+        self.matrices = {}
+        self.totals = {}
+        part = df.iloc[start:stop]
+        for key, col in FILTER_FIELDS.items():
+            if key == PARTITION_FIELD or col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(part[col].astype(object), sort=True)
+            # One row per value, so facet counts for a field are a single
+            # AND and popcount over the whole matrix.
+            matrix = np.empty((len(uniques), (self.size + 7) // 8), dtype=np.uint8)
+            for code in range(len(uniques)):
+                matrix[code] = np.packbits(codes == code)
+            values = [str(value) for value in uniques]
+            self.matrices[key] = (values, matrix)
+            self.bitmaps[key] = dict(zip(values, matrix))
+            self.totals[key] = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    def _field_bits(self, key: str, values: list) -> np.ndarray:
+        bitmaps = self.bitmaps[key]
+        selected = [bitmaps[str(v)] for v in values if str(v) in bitmaps]
+        if not selected:
+            return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(selected, axis=0)
+
+    def mask(self, filters: dict) -> np.ndarray | None:
+        bits = None
+        for key in FILTER_FIELDS:
+            values = _coerce_list(filters.get(key))
+            if not values or key not in self.bitmaps:
+                continue
+            field_bits = self._field_bits(key, values)
+            bits = field_bits if bits is None else bits & field_bits
+        return bits
+
+    def positions(self, filters: dict) -> np.ndarray:
+        bits = self.mask(filters)
+        if bits is None:
+            return np.arange(self.start, self.stop)
+        return self.start + np.flatnonzero(np.unpackbits(bits, count=self.size))
+
+    def facet(self, key: str, filters: dict) -> dict:
+        values, matrix = self.matrices[key]
+        others = self.mask({k: v for k, v in filters.items() if k != key})
+        if others is None:
+            counts = self.totals[key]
+        else:
+            counts = np.bitwise_count(matrix & others).sum(axis=1)
+        return dict(zip(values, counts.tolist()))
+
+    def count(self, filters: dict) -> int:
+        bits = self.mask(filters)
+        return self.size if bits is None else int(np.bitwise_count(bits).sum())
+
+    def contains(self, key: str, values: list, positions: np.ndarray) -> np.ndarray:
+        if key not in self.bitmaps:
+            return np.ones(len(positions), dtype=bool)
+        bits = self._field_bits(key, values)
+        offsets = positions - self.start
+        return ((bits[offsets >> 3] >> (7 - (offsets & 7))) & 1).astype(bool)
+
+    def added(self, key: str, old: list, new: list, filters: dict) -> np.ndarray | None:
+        if key not in self.bitmaps:
+            return np.empty(0, dtype=np.intp)
+        if new:
+            bits = self._field_bits(key, sorted(set(new) - set(old)))
+        else:
+            bits = ~self._field_bits(key, old)
+        others = self.mask({k: v for k, v in filters.items() if k != key})
+        if others is not None:
+            bits &= others
+        # Only the bytes with a set bit are unpacked, so a small widening
+        # costs one pass over the bitmap rather than one per row.
+        nonzero = np.flatnonzero(bits != 0)
+        if len(nonzero) > REFINE_MAX_FRACTION * len(bits):
+            return None
+        offsets = (nonzero[:, None] * 8 + np.arange(8)).ravel()
+        offsets = offsets[np.unpackbits(bits[nonzero]).astype(bool)]
+        return self.start + offsets[offsets < self.size]
+
+
+class FilterIndex:
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        # One bitmap index per survey wave; the year filter picks partitions
+        # by row range and never reads the bitmaps of the waves it excludes.
+        self.partitions = [
+            PartitionIndex(df, label, start, stop)
+            for label, start, stop in partition_ranges(df)
+        ]
+
+    def partitions_for(self, filters: dict) -> list[PartitionIndex]:
+        years = {str(v) for v in _coerce_list(filters.get(PARTITION_FIELD))}
+        return [
+            part
+            for part in self.partitions
+            if not years or part.label is None or part.label in years
+        ]
+
+    def positions(self, filters: dict) -> np.ndarray | None:
+        if not canonical_filters(filters):
+            return None
+        chunks = [part.positions(filters) for part in self.partitions_for(filters)]
+        if not chunks:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(chunks)
+
+    def count(self, filters: dict) -> int:
+        if not canonical_filters(filters):
+            return self.size
+        return sum(part.count(filters) for part in self.partitions_for(filters))
+
+    def facet_counts(self, filters: dict | None) -> dict:
+        # Each field is counted under every other field's selection, so the
+        # counts show what picking a value would return.
+        filters = canonical_filters(filters)
+        counts = {key: {} for key in FILTER_FIELDS}
+        for part in self.partitions:
+            if part.label is not None:
+                year = counts[PARTITION_FIELD]
+                year[part.label] = year.get(part.label, 0) + part.count(filters)
+        for part in self.partitions_for(filters):
+            for key in part.matrices:
+                field = counts[key]
+                for value, count in part.facet(key, filters).items():
+                    field[value] = field.get(value, 0) + count
+        return counts
+
+    def _split(self, positions: np.ndarray):
+        for part in self.partitions:
+            lo, hi = np.searchsorted(positions, [part.start, part.stop])
+            if hi > lo:
+                yield part, slice(lo, hi)
+
+    def refine(
+        self, previous: dict, positions: np.ndarray | None, filters: dict
+    ) -> np.ndarray | None:
+        previous, filters = canonical_filters(previous), canonical_filters(filters)
+        if (
+            positions is None
+            or not filters
+            or previous.get(PARTITION_FIELD) != filters.get(PARTITION_FIELD)
+        ):
+            return None
+        narrowed, widened = [], []
+        for key in FILTER_FIELDS:
+            old, new = set(previous.get(key, [])), set(filters.get(key, []))
+            if old == new:
+                continue
+            if new and (not old or new < old):
+                narrowed.append(key)
+            elif old and (not new or new > old):
+                widened.append(key)
+            else:
+                return None
+
+        if narrowed and not widened:
+            if len(positions) > REFINE_MAX_FRACTION * self.size:
+                return None
+            keep = np.ones(len(positions), dtype=bool)
+            for part, chunk in self._split(positions):
+                for key in narrowed:
+                    keep[chunk] &= part.contains(key, filters[key], positions[chunk])
+            return positions[keep]
+        if len(widened) == 1 and not narrowed:
+            key = widened[0]
+            # The added rows fail the old values, so they never overlap the
+            # previous selection; a stable sort of two sorted runs is a merge.
+            added = [
+                part.added(key, previous[key], filters.get(key, []), filters)
+                for part in self.partitions_for(filters)
+            ]
+            if any(chunk is None for chunk in added):
+                return None
+            return np.sort(np.concatenate([positions, *added]), kind="stable")
+        if not narrowed and not widened:
+            return positions
+        return None
+
+
+def apply_filters(
+    df: pd.DataFrame, filters: dict, index: FilterIndex | None = None
+) -> pd.DataFrame:
+    if index is not None:
+        positions = index.positions(filters)
+        return df if positions is None else df.iloc[positions]
     filtered = df
     for key, col in FILTER_FIELDS.items():
         values = _coerce_list(filters.get(key))
         if values and col in filtered.columns:
-            filtered = filtered[filtered[col].isin(values)]
+            selected = {str(v) for v in values}
+            filtered = filtered[filtered[col].astype(str).isin(selected)]
     return filtered
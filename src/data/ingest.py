@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import argparse
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.loader import CLEAN_DIR, SNAPSHOT_TAG, wave_paths
+from src.data.schema import LIKERT_COLUMNS, PERCENT_COLUMNS, apply_schema
+from src.data.snapshot import SnapshotWriter
+
+
+ROOT = Path(__file__).resolve().parents[2]
+RAW_DIR = ROOT / "Datasets" / "Raw data"
+
+DEFAULT_CHUNKSIZE = 100_000
+
+RENAME_MAP = {
+    # Identifiers & demographics
+    "Response ID": "response_id",
+    "What year were you born?": "birth_year",
+    "What is your gender?": "gender",
+    "Which of the following best describes your industry?": "industry",
+    "Which of the following best describes your industry? (Detailed)": "industry_detailed",
+    "Which of the following best describes your current occupation?": "occupation",
+    "Which of the following best describes your current occupation? (Detailed)": "occupation_detailed",
+    "How many people are currently employed by your organisation?": "org_size",
+    "Do you manage people as part of your current occupation?": "manager",
+    "Which of the following best describes your household?": "household",
+    "How long have you been in your current job?": "jobtenure",
+    "Metro / Regional": "location",
+    # Remote work exposure
+    "Thinking about your current job, how much of your time did you spend remote working last year?":
+        "remote_work_pct_last_year",
+    "How much of your time would you have preferred to work remotely last year?":
+        "remote_work_pref_pct_last_year",
+
+    "Thinking about your current job, how much of your time did you spend remote working in the last 3 months?":
+        "remote_work_pct_last_3_months",
+    "How much of your time would you have preferred to work remotely in the last 3 months?":
+        "remote_work_pref_pct_last_3_months",
+
+    "Imagine that COVID-19 is cured or eradicated. Going forward, how much of your time would you prefer to work remotely?":
+        "remote_work_pref_pct_future",
+    # Likert – last year
+    "Thinking about remote working last year, how strongly do you agree or disagree with the following statements? - My organisation encouraged people to work remotely":
+        "remote_last_year_org_encouraged_agreement",
+    "Thinking about remote working last year, how strongly do you agree or disagree with the following statements? - My organisation was well prepared for me to work remotely":
+        "remote_last_year_org_prepared_agreement",
+    "Thinking about remote working last year, how strongly do you agree or disagree with the following statements? - It was common for people in my organisation to work remotely":
+        "remote_last_year_common_practice_agreement",
+    "Thinking about remote working last year, how strongly do you agree or disagree with the following statements? - It was easy to get permission to work remotely":
+        "remote_last_year_permission_easy_agreement",
+    "Thinking about remote working last year, how strongly do you agree or disagree with the following statements? - I could easily collaborate with colleagues when working remotely":
+        "remote_last_year_collaboration_easy_agreement",
+    "Thinking about remote working last year, how strongly do you agree or disagree with the following statements? - I would recommend remote working to others":
+        "remote_last_year_recommend_agreement",
+    # Likert – last 3 months
+    "Thinking about remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - My organisation encouraged people to work remotely":
+        "remote_last_3_months_org_encouraged_agreement",
+    "Thinking about remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - My organisation was well prepared for me to work remotely":
+        "remote_last_3_months_org_prepared_agreement",
+    "Thinking about remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - It was common for people in my organisation to work remotely":
+        "remote_last_3_months_common_practice_agreement",
+    "Thinking about remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - It was easy to get permission to work remotely":
+        "remote_last_3_months_permission_easy_agreement",
+    "Thinking about remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - I could easily collaborate with colleagues when working remotely":
+        "remote_last_3_months_collaboration_easy_agreement",
+    "Thinking about remote working in the last 3 months, how strongly do you agree or disagree with the following statements? - I would recommend remote working to others":
+        "remote_last_3_months_recommend_agreement",
+    # Productivity
+    "This question is about your productivity. Productivity means what you produce for each hour that you work. It includes the amount of work you achieve each hour, and the quality of your work each hour. Please compare your productivity when you work remotely to when you work at your employer's workplace. Roughly how productive are you, each hour, when you work remotely?":
+        "remote_productivity_relative",
+    # Time use – onsite
+    "On a day when you attend your employer's workplace, how many hours would you spend doing the following activities? - Preparing for work and commuting":
+        "onsite_commute_hours",
+    "On a day when you attend your employer's workplace, how many hours would you spend doing the following activities? - Working":
+        "onsite_work_hours",
+    "On a day when you attend your employer's workplace, how many hours would you spend doing the following activities? - Personal and family time":
+        "onsite_personal_hours",
+    "On a day when you attend your employer's workplace, how many hours would you spend doing the following activities? - Caring and domestic responsibilities":
+        "onsite_caring_hours",
+    # Time use – remote
+    "On a day when you do remote work, how many hours would you spend doing the following activities? - Preparing for work and commuting":
+        "remote_commute_hours",
+    "On a day when you do remote work, how many hours would you spend doing the following activities? - Working":
+        "remote_work_hours",
+    "On a day when you do remote work, how many hours would you spend doing the following activities? - Personal and family time":
+        "remote_personal_hours",
+    "On a day when you do remote work, how many hours would you spend doing the following activities? - Caring and domestic responsibilities":
+        "remote_caring_hours",
+}
+
+_RECENT_2021 = (
+    "Thinking about remote working in the last 6 months, how strongly do you agree or "
+    "disagree with the following statements? Please select a single response per row - "
+)
+_ONSITE_2021 = (
+    "Think about your experience this year. On a day when you attend your employer's "
+    "workplace, how many hours would you spend doing the following activities? For "
+    "example, a response of '1' means 1 hour. A response of '0.5' means half an hour. "
+    "Your responses should add to 24 hours. - "
+)
+_REMOTE_2021 = (
+    "Think about your experience this year. On a day when you work remotely, how many "
+    "hours would you spend doing the following activities? For example, a response of "
+    "'1' means 1 hour. A response of '0.5' means half an hour. Your responses should add "
+    "to 24 hours. - "
+)
+
+# The 2021 questionnaire asks about "this year" and "the last 6 months" rather
+# than 2020's "last 3 months", and dropped the pre-COVID questions. Only the
+# questions that line up with 2020 are mapped; the rest keep their text headers.
+RENAME_MAP_2021 = {
+    "Response ID": "response_id",
+    "What year were you born?": "birth_year",
+    "What is your gender?": "gender",
+    "Which of the following best describes your industry?": "industry",
+    "Which of the following best describes your current occupation?": "occupation",
+    "How many people are currently employed by your organisation?": "org_size",
+    "Do you manage people as part of your current job?": "manager",
+    "Which of the following best describes your household?": "household",
+    "How long have you been in your current job? If you have more than one job, please answer all questions for your main job.":
+        "jobtenure",
+    "Metro or Regional": "location",
+    "Thinking about your current job, how much of your work time have you spent working remotely this year? If you work a 5 day week, each day of remote working equals 20% of your time.":
+        "remote_work_pct_last_3_months",
+    "How much of your work time would you have preferred to work remotely so far this year? If you work a 5 day week, each day of remote working equals 20% of your time.":
+        "remote_work_pref_pct_last_3_months",
+    "Imagine that COVID-19 is cured or eradicated. Going forward, how much of your work time would you prefer to work remotely? If you work a 5 day week, each day of remote working equals 20% of your time.":
+        "remote_work_pref_pct_future",
+    _RECENT_2021 + "My organisation encouraged people to work remotely":
+        "remote_last_3_months_org_encouraged_agreement",
+    _RECENT_2021 + "My organisation was well prepared for me to work remotely":
+        "remote_last_3_months_org_prepared_agreement",
+    _RECENT_2021 + "It was common for people in my organisation to work remotely":
+        "remote_last_3_months_common_practice_agreement",
+    _RECENT_2021 + "It was easy to get permission to work remotely":
+        "remote_last_3_months_permission_easy_agreement",
+    _RECENT_2021 + "I could easily collaborate with colleagues when working remotely":
+        "remote_last_3_months_collaboration_easy_agreement",
+    "This question is about your productivity. Productivity means what you produce for each hour that you work. It includes the amount of work you achieve each hour, and the quality of your work each hour. Please compare your productivity when you work remotely to when you work at your employer's workplace. Roughly how productive are you, each hour, when you work remotely?":
+        "remote_productivity_relative",
+    _ONSITE_2021 + "Preparing for work and commuting": "onsite_commute_hours",
+    _ONSITE_2021 + "Working": "onsite_work_hours",
+    _ONSITE_2021 + "Personal and family time": "onsite_personal_hours",
+    _ONSITE_2021 + "Caring and domestic responsibilities": "onsite_caring_hours",
+    _REMOTE_2021 + "Preparing for work and commuting": "remote_commute_hours",
+    _REMOTE_2021 + "Working": "remote_work_hours",
+    _REMOTE_2021 + "Personal and family time": "remote_personal_hours",
+    _REMOTE_2021 + "Caring and domestic responsibilities": "remote_caring_hours",
+}
+
+# 2021 shortened several answer labels; they are mapped back to the 2020
+# wording so both waves share one set of filter values. The 2021 export has
+# no detailed industry question, so industry_detailed needs no mapping.
+VALUE_MAPS_2021 = {
+    "gender": {"I would rather not say": "Rather not say"},
+    "industry": {
+        label: f"{label} Services"
+        for label in [
+            "Accommodation and Food",
+            "Administrative and Support",
+            "Arts and Recreation",
+            "Electricity, Gas, Water and Waste",
+            "Financial and Insurance",
+            "Professional, Scientific and Technical",
+            "Rental, Hiring and Real Estate",
+        ]
+    },
+    "industry_detailed": {},
+    "org_size": {"I am a sole trader/owner-operator": "I am the only employee"},
+}
+
+# Columns whose values must line up across waves for the shared filters.
+WAVE_VALUE_COLUMNS = ["gender", "industry", "org_size", "location"]
+
+LIKERT_MAP = {
+    "strongly disagree": 1,
+    "somewhat disagree": 2,
+    "neither agree nor disagree": 3,
+    "somewhat agree": 4,
+    "strongly agree": 5,
+    # 2021 asks the future questions on a likelihood scale.
+    "very unlikely": 1,
+    "somewhat unlikely": 2,
+    "neither unlikely or likely": 3,
+    "somewhat likely": 4,
+    "very likely": 5,
+}
+
+WAVES = {
+    2020: (RENAME_MAP, {}),
+    2021: (RENAME_MAP_2021, VALUE_MAPS_2021),
+}
+
+
+def clean_column_text(col: str) -> str:
+    col = col.encode("utf-8", "ignore").decode("utf-8")
+    col = re.sub(r"[\x91\x92\x93\x94]", "'", col)
+    col = re.sub(r"\s+", " ", col).strip()
+    return col
+
+
+def parse_remote_pct(value) -> float:
+    text = str(value).lower()
+    if "rarely" in text or "prefer not" in text:
+        return 0
+    if "less than" in text:
+        return 5
+    if "%" in text:
+        return int(text.split("%")[0])
+    return np.nan
+
+
+def map_unique(series: pd.Series, mapper) -> pd.Series:
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([mapper(v) for v in uniques] + [np.nan], dtype=float)
+    return pd.Series(mapped[codes], index=series.index)
+
+
+def likert_score(value) -> float:
+    return LIKERT_MAP.get(str(value).lower(), np.nan)
+
+
+def normalize_location(series: pd.Series) -> pd.Series:
+    codes, uniques = pd.factorize(series)
+    labels = np.array(
+        ["Regional" if "regio" in str(v).lower() else v for v in uniques] + [np.nan],
+        dtype=object,
+    )
+    return pd.Series(labels[codes], index=series.index)
+
+
+def clean_columns(columns, rename_map: dict) -> list[str]:
+    cleaned = [clean_column_text(c) for c in columns]
+    return [rename_map.get(c, c) for c in cleaned]
+
+
+def clean_chunk(
+    chunk: pd.DataFrame, rename_map: dict, value_maps: dict | None = None
+) -> pd.DataFrame:
+    chunk = chunk.set_axis(clean_columns(chunk.columns, rename_map), axis=1)
+    updates = {}
+    for col, mapping in (value_maps or {}).items():
+        if mapping and col in chunk.columns:
+            updates[col] = chunk[col].replace(mapping)
+    for col in LIKERT_COLUMNS:
+        if col in chunk.columns:
+            updates[col] = map_unique(chunk[col], likert_score)
+    for col in PERCENT_COLUMNS:
+        if col in chunk.columns:
+            updates[col] = map_unique(chunk[col], parse_remote_pct)
+    if "location" in chunk.columns:
+        updates["location"] = normalize_location(chunk["location"])
+    return apply_schema(chunk.assign(**updates))
+
+
+def raw_wave_files(raw_dir: Path = RAW_DIR) -> dict:
+    files = {}
+    for path in sorted(Path(raw_dir).glob("*_rws.csv")):
+        year = path.stem.split("_")[0]
+        if year.isdigit():
+            files[int(year)] = path
+    return files
+
+
+def write_cleaned(chunks, out_path: Path) -> int:
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(f".{out_path.name}.tmp")
+    writer = SnapshotWriter(out_path, tag=SNAPSHOT_TAG)
+    try:
+        with open(tmp_path, "w", encoding="latin1", newline="") as handle:
+            for index, chunk in enumerate(chunks):
+                chunk.to_csv(handle, index=False, header=index == 0)
+                writer.append(chunk)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        writer.abort()
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    writer.close()
+    return writer.rows
+
+
+def ingest_file(
+    raw_path: Path,
+    out_path: Path,
+    rename_map: dict,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    value_maps: dict | None = None,
+) -> int:
+    reader = pd.read_csv(raw_path, encoding="latin1", chunksize=chunksize)
+    return write_cleaned(
+        (clean_chunk(chunk, rename_map, value_maps) for chunk in reader), out_path
+    )
+
+
+def unmatched_values(paths: dict) -> dict:
+    # Filter values that only some waves use, which select nothing in the rest.
+    values = {}
+    for year, path in paths.items():
+        frame = pd.read_csv(
+            path,
+            encoding="latin1",
+            usecols=lambda col: col in WAVE_VALUE_COLUMNS,
+        )
+        for col in frame.columns:
+            values.setdefault(col, {})[year] = set(frame[col].dropna().astype(str))
+    unmatched = {}
+    for col, by_year in values.items():
+        shared = set.intersection(*by_year.values())
+        for year, found in by_year.items():
+            if found - shared:
+                unmatched.setdefault(col, {})[year] = sorted(found - shared)
+    return unmatched
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Clean raw survey exports into the CSV and snapshot the app loads."
+    )
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR)
+    parser.add_argument("--out-dir", type=Path, default=CLEAN_DIR)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--year", type=int, action="append", dest="years")
+    args = parser.parse_args(argv)
+
+    for year, raw_path in raw_wave_files(args.raw_dir).items():
+        if args.years and year not in args.years:
+            continue
+        if year not in WAVES:
+            print(f"{raw_path.name}: no column mapping for {year}, skipped")
+            continue
+        out_path = args.out_dir / f"cleaned_{year}.csv"
+        rename_map, value_maps = WAVES[year]
+        rows = ingest_file(raw_path, out_path, rename_map, args.chunksize, value_maps)
+        print(f"{raw_path.name}: {rows:,} rows -> {out_path}")
+
+    for col, by_year in unmatched_values(wave_paths(args.out_dir)).items():
+        for year, values in by_year.items():
+            print(f"{col}: only in {year}: {', '.join(values)}")
+
+
+if __name__ == "__main__":
+    main()
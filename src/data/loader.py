@@ -1,18 +1,162 @@
+import hashlib
+import json
+import logging
 from functools import lru_cache
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
+from src.data.schema import SCHEMA_VERSION, apply_schema, memory_usage
+from src.data.snapshot import read_snapshot, source_digest, write_snapshot
 
-DEFAULT_DATA_PATH = (
-    Path(__file__).resolve().parents[2]
-    / "Datasets"
-    / "Cleaned Data"
-    / "cleaned_2020.csv"
-)
+
+CLEAN_DIR = Path(__file__).resolve().parents[2] / "Datasets" / "Cleaned Data"
+
+DEFAULT_DATA_PATH = CLEAN_DIR / "cleaned_2020.csv"
+
+SNAPSHOT_TAG = f"schema-{SCHEMA_VERSION}"
+
+logger = logging.getLogger(__name__)
 
 
 @lru_cache(maxsize=2)
-def load_data(path: Path | None = None) -> pd.DataFrame:
+def load_data(
+    path: Path | None = None, use_snapshot: bool = True, mmap: bool = False
+) -> pd.DataFrame:
     data_path = Path(path) if path else DEFAULT_DATA_PATH
-    return pd.read_csv(data_path, encoding="latin1")
+    if use_snapshot:
+        cached = read_snapshot(data_path, tag=SNAPSHOT_TAG, mmap=mmap)
+        if cached is not None:
+            return cached
+    raw = pd.read_csv(data_path, encoding="latin1")
+    df = apply_schema(raw)
+    logger.info(
+        "Loaded %s: %d rows, %.1f MB raw, %.1f MB typed",
+        data_path.name,
+        len(df),
+        memory_usage(raw) / 1e6,
+        memory_usage(df) / 1e6,
+    )
+    if use_snapshot:
+        try:
+            write_snapshot(df, data_path, tag=SNAPSHOT_TAG)
+        except OSError:
+            return df
+        if mmap:
+            return read_snapshot(data_path, tag=SNAPSHOT_TAG, mmap=True)
+    return df
+
+
+def wave_paths(directory: Path | None = None) -> dict:
+    paths = {}
+    for path in sorted(Path(directory or CLEAN_DIR).glob("cleaned_*.csv")):
+        year = path.stem.split("_")[-1]
+        if year.isdigit():
+            paths[int(year)] = path
+    return paths
+
+
+def _concat_waves(frames: list) -> pd.DataFrame:
+    if len(frames) == 1:
+        return frames[0]
+    dtypes = {}
+    for frame in frames:
+        for col, dtype in frame.dtypes.items():
+            dtypes.setdefault(col, dtype)
+    # Waves carry different category sets and question batteries, so align
+    # categoricals on the union and give absent columns an empty typed column.
+    categories = {
+        col: pd.CategoricalDtype(
+            union_categoricals(
+                [f[col].astype("category") for f in frames if col in f.columns],
+                sort_categories=True,
+            ).categories
+        )
+        for col, dtype in dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    }
+    aligned = []
+    for frame in frames:
+        columns = {}
+        for col, dtype in dtypes.items():
+            if col not in frame.columns:
+                columns[col] = pd.Series(index=frame.index, dtype=categories.get(col, dtype))
+            elif col in categories:
+                columns[col] = frame[col].astype(categories[col])
+            else:
+                columns[col] = frame[col]
+        aligned.append(pd.DataFrame(columns))
+    return pd.concat(aligned, ignore_index=True)
+
+
+def wave_manifest(paths: dict) -> Path:
+    # Stands in as the snapshot source for the combined waves: its content is
+    # every wave's digest, so it changes exactly when a wave does.
+    directory = next(iter(paths.values())).parent
+    manifest = directory / f".waves_{'_'.join(str(year) for year in paths)}.json"
+    content = json.dumps(
+        {str(year): source_digest(path) for year, path in paths.items()}, sort_keys=True
+    )
+    try:
+        current = manifest.read_text(encoding="utf-8")
+    except OSError:
+        current = None
+    if current != content:
+        manifest.write_text(content, encoding="utf-8")
+    return manifest
+
+
+def _mapped_waves(paths: dict, frames: list) -> pd.DataFrame:
+    # Concatenating copies every column onto the heap, so the combined frame
+    # gets a snapshot of its own and is mapped from there.
+    try:
+        manifest = wave_manifest(paths)
+        cached = read_snapshot(manifest, tag=SNAPSHOT_TAG, mmap=True)
+        if cached is not None:
+            return cached
+        write_snapshot(_concat_waves(frames), manifest, tag=SNAPSHOT_TAG)
+        mapped = read_snapshot(manifest, tag=SNAPSHOT_TAG, mmap=True)
+    except OSError:
+        mapped = None
+    if mapped is None:
+        logger.warning(
+            "Could not snapshot the combined waves; mmap is not in effect for them"
+        )
+        return _concat_waves(frames)
+    return mapped
+
+
+@lru_cache(maxsize=2)
+def load_waves(
+    years: tuple | None = None,
+    directory: Path | None = None,
+    use_snapshot: bool = True,
+    mmap: bool = False,
+) -> pd.DataFrame:
+    paths = wave_paths(directory)
+    if years:
+        paths = {year: path for year, path in paths.items() if year in years}
+    if not paths:
+        raise FileNotFoundError(f"no cleaned survey waves found in {directory or CLEAN_DIR}")
+    # Each wave is its own partition on disk; rows stay grouped by year so the
+    # filter engine can prune whole waves by row range.
+    frames = []
+    for year, path in paths.items():
+        df = load_data(path, use_snapshot=use_snapshot, mmap=mmap)
+        frames.append(df.assign(survey_year=np.full(len(df), year, dtype=np.int16)))
+    if mmap and use_snapshot and len(frames) > 1:
+        return _mapped_waves(paths, frames)
+    if mmap and len(frames) > 1:
+        logger.warning("mmap needs snapshots; the combined waves are loaded in memory")
+    return _concat_waves(frames)
+
+
+@lru_cache(maxsize=2)
+def dataset_version(path: Path | None = None) -> str:
+    paths = [Path(path)] if path else list(wave_paths().values())
+    digest = hashlib.sha256()
+    for data_path in paths:
+        digest.update(source_digest(data_path).encode())
+    return digest.hexdigest()[:16]
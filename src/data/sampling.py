@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.data.filters import FILTER_FIELDS
+from src.data.selection import SelectionStore
+from src.data.transforms import build_derived_tables
+
+
+DEFAULT_SAMPLE_ROWS = 100_000
+
+# Selections up to this many respondents are always computed exactly.
+EXACT_MAX_ROWS = 250_000
+
+Z_95 = 1.959963984540054
+
+
+def stratum_codes(base: pd.DataFrame) -> np.ndarray:
+    codes, shape = [], []
+    for col in FILTER_FIELDS.values():
+        if col not in base.columns:
+            continue
+        column_codes, uniques = pd.factorize(base[col])
+        codes.append(np.where(column_codes < 0, len(uniques), column_codes))
+        shape.append(len(uniques) + 1)
+    if not codes:
+        return np.zeros(len(base), dtype=np.intp)
+    return np.ravel_multi_index(codes, shape)
+
+
+def stratified_positions(
+    base: pd.DataFrame, fraction: float, seed: int = 0
+) -> np.ndarray:
+    # Every stratum keeps round(fraction * size) rows, rounded at random so
+    # each row is drawn with the same probability; the sample stays
+    # self-weighting while each filter cell is represented in proportion.
+    rng = np.random.default_rng(seed)
+    strata = stratum_codes(base)
+    order = np.lexsort((rng.random(len(base)), strata))
+    sorted_strata = strata[order]
+    starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+    sizes = np.diff(np.r_[starts, len(base)])
+    expected = sizes * fraction
+    keep = np.floor(expected).astype(np.int64)
+    keep += rng.random(len(sizes)) < expected - keep
+    rank = np.arange(len(base)) - np.repeat(starts, sizes)
+    return np.sort(order[rank < np.repeat(keep, sizes)])
+
+
+class StratifiedSample:
+    def __init__(
+        self,
+        base: pd.DataFrame,
+        rows: int = DEFAULT_SAMPLE_ROWS,
+        exact_max_rows: int = EXACT_MAX_ROWS,
+        seed: int = 0,
+    ):
+        self.fraction = min(1.0, rows / max(len(base), 1))
+        self.exact_max_rows = exact_max_rows
+        self.positions = stratified_positions(base, self.fraction, seed)
+        self.derived = build_derived_tables(
+            base.iloc[self.positions].reset_index(drop=True), lazy=True
+        )
+        self.selections = SelectionStore(self.derived["base"])
+
+    def covers(self, selections: SelectionStore, selection: dict | None) -> bool:
+        return selections.count(selection) > self.exact_max_rows
+
+
+def choose_source(derived, selections, sample, selection) -> tuple:
+    if sample is not None and sample.covers(selections, selection):
+        return sample.derived, sample.selections, sample.fraction
+    return derived, selections, None
+
+
+def median_interval(values, fraction: float = 1.0) -> tuple[float, float] | None:
+    # Distribution-free interval from the order statistics around the median.
+    values = np.sort(np.asarray(values, dtype=float))
+    values = values[~np.isnan(values)]
+    n = len(values)
+    if n < 2:
+        return None
+    half = Z_95 * np.sqrt(n * (1 - fraction)) / 2
+    lower = int(max(np.floor(n / 2 - half), 0))
+    upper = int(min(np.ceil(n / 2 + half), n - 1))
+    return float(values[lower]), float(values[upper])
+
+
+def linear_interval(
+    table: pd.DataFrame,
+    group: str,
+    value: str,
+    weights: dict,
+    fraction: float = 1.0,
+) -> tuple[float, float] | None:
+    # Interval for sum(weights[g] * mean of group g). Each respondent's
+    # influence is summed over all of their answers, so correlated answers
+    # from the same person widen the interval as they should.
+    rows = table[table[group].astype(str).isin(list(weights))]
+    rows = rows[rows[value].notna()]
+    if rows.empty:
+        return None
+    codes, groups = pd.factorize(rows[group].astype(str))
+    values = rows[value].to_numpy(dtype=float)
+    counts = np.bincount(codes)
+    means = np.bincount(codes, weights=values) / counts
+    coefficients = np.array([weights[g] for g in groups], dtype=float)
+    estimate = float((coefficients * means).sum())
+    influence = np.bincount(
+        pd.factorize(rows["row"])[0],
+        weights=(coefficients / counts)[codes] * (values - means[codes]),
+    )
+    margin = Z_95 * np.sqrt((influence**2).sum() * (1 - fraction))
+    return estimate - margin, estimate + margin
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.data.transforms import PERIOD_MAP, SUPPORT_MAP, TIME_COLUMNS
+
+
+SCHEMA_VERSION = 1
+
+LIKERT_MISSING = -1
+
+CATEGORICAL_COLUMNS = [
+    "gender",
+    "industry",
+    "industry_detailed",
+    "occupation",
+    "occupation_detailed",
+    "org_size",
+    "manager",
+    "household",
+    "jobtenure",
+    "location",
+    "remote_productivity_relative",
+]
+
+CATEGORICAL_PREFIXES = (
+    "From the following, please select",
+    "Compare remote working to working at your employer's workplace",
+)
+
+LIKERT_COLUMNS = list(SUPPORT_MAP)
+
+PERCENT_COLUMNS = list(PERIOD_MAP) + [
+    "remote_work_pref_pct_last_year",
+    "remote_work_pref_pct_last_3_months",
+]
+
+HOURS_COLUMNS = list(TIME_COLUMNS)
+
+
+def column_types(columns) -> dict:
+    types = {}
+    for col in columns:
+        if col in CATEGORICAL_COLUMNS or col.startswith(CATEGORICAL_PREFIXES):
+            types[col] = "category"
+        elif col in LIKERT_COLUMNS:
+            types[col] = "Int8"
+        elif col in PERCENT_COLUMNS or col in HOURS_COLUMNS:
+            types[col] = "float32"
+    return types
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    typed = {}
+    for col, dtype in column_types(df.columns).items():
+        series = df[col]
+        if dtype == "Int8":
+            series = pd.to_numeric(series, errors="coerce").round()
+        if str(series.dtype) != dtype:
+            typed[col] = series.astype(dtype)
+    return df.assign(**typed) if typed else df
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def likert_to_sentinel(series: pd.Series) -> np.ndarray:
+    return series.to_numpy(dtype=np.int8, na_value=LIKERT_MISSING)
+
+
+def likert_from_sentinel(values: np.ndarray) -> pd.arrays.IntegerArray:
+    values = np.asarray(values, dtype=np.int8)
+    return pd.arrays.IntegerArray(values, values == LIKERT_MISSING)
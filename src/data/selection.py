@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from src.data.filters import FilterIndex, canonical_filters, filter_key
+
+
+class SelectionStore:
+    def __init__(self, base: pd.DataFrame, index: FilterIndex | None = None, maxsize: int = 256):
+        self.base = base
+        self.index = index if index is not None else FilterIndex(base)
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _lookup(self, key: str):
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, self._entries[key]
+
+    def _store(self, key: str, positions) -> None:
+        with self._lock:
+            self._entries[key] = positions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def resolve(self, filters: dict | None) -> np.ndarray | None:
+        key = filter_key(filters)
+        found, positions = self._lookup(key)
+        if not found:
+            positions = self.index.positions(canonical_filters(filters))
+            self._store(key, positions)
+        return positions
+
+    def refine(self, previous: dict | None, filters: dict | None) -> None:
+        # Derive the new selection from the session's previous one when it
+        # is still cached; the index declines deltas it cannot apply cheaply.
+        key = filter_key(filters)
+        if not previous or self._lookup(key)[0]:
+            return
+        found, positions = self._lookup(filter_key(previous.get("filters")))
+        if not found:
+            return
+        positions = self.index.refine(previous.get("filters"), positions, filters)
+        if positions is not None:
+            self._store(key, positions)
+
+    def publish(self, filters: dict | None, previous: dict | None = None) -> dict:
+        canonical = canonical_filters(filters)
+        self.refine(previous, canonical)
+        self.resolve(canonical)
+        return {"key": filter_key(canonical), "filters": canonical}
+
+    def positions(self, selection: dict | None) -> np.ndarray | None:
+        if not selection:
+            return None
+        # Another worker may have published the key, so re-resolve on a miss.
+        return self.resolve(selection.get("filters"))
+
+    def count(self, selection: dict | None) -> int:
+        if not selection:
+            return len(self.base)
+        # A popcount over the bitmaps is far cheaper than resolving positions.
+        found, positions = self._lookup(filter_key(selection.get("filters")))
+        if not found:
+            return self.index.count(canonical_filters(selection.get("filters")))
+        return len(self.base) if positions is None else len(positions)
+
+    def frame(self, selection: dict | None) -> pd.DataFrame:
+        positions = self.positions(selection)
+        return self.base if positions is None else self.base.iloc[positions]
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.data.filters import FILTER_FIELDS, _coerce_list
+
+
+class ValueHistogram:
+    # Exact counts of every distinct value per filter cell and label. The
+    # survey's percentages take a few dozen distinct values, so merging the
+    # cells of a filter state gives exact quantiles without touching rows.
+    def __init__(
+        self, table: pd.DataFrame, base: pd.DataFrame, labels: list[str], value: str
+    ):
+        self.value = value
+        table = table[table[value].notna()]
+        rows = table["row"].to_numpy()
+        self.values, value_codes = np.unique(
+            table[value].to_numpy(), return_inverse=True
+        )
+
+        self.uniques = {}
+        codes, shape = [], []
+        fields = [
+            (key, base[col], rows)
+            for key, col in FILTER_FIELDS.items()
+            if col in base.columns
+        ]
+        fields += [(label, table[label], None) for label in labels]
+        for key, column, take in fields:
+            column_codes, uniques = pd.factorize(column, sort=True)
+            # The last slot holds rows with a missing value.
+            column_codes = np.where(column_codes < 0, len(uniques), column_codes)
+            self.uniques[key] = uniques
+            codes.append(column_codes if take is None else column_codes[take])
+            shape.append(len(uniques) + 1)
+        codes.append(value_codes)
+        shape.append(len(self.values))
+
+        cells, self.counts = np.unique(
+            np.ravel_multi_index(codes, shape), return_counts=True
+        )
+        unraveled = np.unravel_index(cells, shape)
+        self.codes = dict(zip(self.uniques, unraveled))
+        self.value_codes = unraveled[-1]
+
+    def _selected(self, filters: dict | None) -> np.ndarray:
+        selected = np.ones(len(self.counts), dtype=bool)
+        for key in FILTER_FIELDS:
+            values = {str(v) for v in _coerce_list((filters or {}).get(key))}
+            if not values or key not in self.codes:
+                continue
+            labels = np.asarray(self.uniques[key], dtype=object).astype(str)
+            allowed = np.append(np.isin(labels, list(values)), False)
+            selected &= allowed[self.codes[key]]
+        return selected
+
+    def counts_by(self, keys: list[str], filters: dict | None = None) -> pd.DataFrame:
+        selected = self._selected(filters)
+        # Drop the missing-value slots, as a dropna() before groupby would.
+        for key in keys:
+            selected &= self.codes[key] < len(self.uniques[key])
+        shape = [len(self.uniques[key]) for key in keys] + [len(self.values)]
+        cells = np.ravel_multi_index(
+            [self.codes[key][selected] for key in keys] + [self.value_codes[selected]],
+            shape,
+        )
+        merged = np.bincount(
+            cells, weights=self.counts[selected], minlength=int(np.prod(shape))
+        )
+        present = np.flatnonzero(merged)
+        unraveled = np.unravel_index(present, shape)
+        frame = pd.DataFrame(
+            {key: self.uniques[key].take(codes) for key, codes in zip(keys, unraveled)}
+        )
+        frame[self.value] = self.values[unraveled[-1]]
+        frame["count"] = merged[present].astype(np.int64)
+        return frame
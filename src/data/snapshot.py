@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.schema import likert_from_sentinel, likert_to_sentinel
+
+
+SNAPSHOT_VERSION = 2
+META_FILE = "meta.json"
+
+
+def snapshot_path(source: Path) -> Path:
+    source = Path(source)
+    return source.with_name(f".{source.stem}.snapshot")
+
+
+def file_fingerprint(path: Path, with_hash: bool = False) -> dict:
+    stat = Path(path).stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        fingerprint["sha256"] = _content_hash(path)
+    return fingerprint
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(target: Path, tag: str | None = None) -> dict | None:
+    try:
+        with open(target / META_FILE, encoding="utf-8") as handle:
+            meta = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION:
+        return None
+    if tag is not None and meta.get("tag") != tag:
+        return None
+    return meta
+
+
+def _write_meta(target: Path, meta: dict) -> None:
+    tmp = target / f"{META_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+    os.replace(tmp, target / META_FILE)
+
+
+def _is_fresh(meta: dict, source: Path, target: Path) -> bool:
+    recorded = meta.get("source", {})
+    current = file_fingerprint(source)
+    if current["size"] != recorded.get("size"):
+        return False
+    if current["mtime_ns"] == recorded.get("mtime_ns"):
+        return True
+    # Same size but touched: only the content hash can tell.
+    if _content_hash(source) != recorded.get("sha256"):
+        return False
+    meta["source"]["mtime_ns"] = current["mtime_ns"]
+    try:
+        _write_meta(target, meta)
+    except OSError:
+        pass
+    return True
+
+
+def source_digest(source: Path) -> str:
+    source = Path(source)
+    meta = _read_meta(snapshot_path(source))
+    if meta is not None and _is_fresh(meta, source, snapshot_path(source)):
+        return meta["source"]["sha256"]
+    return _content_hash(source)
+
+
+def read_snapshot(
+    source: Path, tag: str | None = None, mmap: bool = False
+) -> pd.DataFrame | None:
+    source = Path(source)
+    target = snapshot_path(source)
+    meta = _read_meta(target, tag)
+    if meta is None or not source.exists() or not _is_fresh(meta, source, target):
+        return None
+    columns = {}
+    try:
+        for index, spec in enumerate(meta["columns"]):
+            values = np.load(
+                target / f"{index}.npy",
+                mmap_mode="r" if mmap else None,
+                allow_pickle=False,
+            )
+            if spec["kind"] == "string":
+                values = pd.Categorical.from_codes(
+                    values, categories=pd.Index(spec["categories"]), validate=False
+                )
+                # Casting to str would copy every value onto the heap, so a
+                # mapped snapshot keeps text columns as categoricals.
+                if spec["dtype"] == "category" or mmap:
+                    columns[spec["name"]] = values
+                else:
+                    columns[spec["name"]] = pd.Series(values).astype(spec["dtype"])
+            elif spec["kind"] == "likert":
+                columns[spec["name"]] = likert_from_sentinel(values)
+            else:
+                columns[spec["name"]] = values
+    except (OSError, ValueError, KeyError):
+        return None
+    # Unconsolidated columns keep pointing at the read-only mapped buffers.
+    return pd.DataFrame(columns, copy=False) if mmap else pd.DataFrame(columns)
+
+
+def _code_dtype(categories: int) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        if categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class SnapshotWriter:
+    BLOCK_ROWS = 1 << 20
+
+    def __init__(self, source: Path, tag: str | None = None):
+        self.source = Path(source)
+        self.tag = tag
+        self.rows = 0
+        self.specs = None
+        self._lookups = {}
+        self._storage = []
+        self._staging = Path(
+            tempfile.mkdtemp(prefix=f".{self.source.stem}.", dir=self.source.parent)
+        )
+
+    def _spec(self, name: str, series: pd.Series) -> tuple[dict, np.dtype]:
+        if str(series.dtype) == "Int8":
+            return {"name": name, "kind": "likert"}, np.dtype(np.int8)
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            return {"name": name, "kind": "numeric"}, series.to_numpy().dtype
+        self._lookups[name] = {}
+        spec = {"name": name, "kind": "string", "dtype": str(series.dtype)}
+        return spec, np.dtype(np.int32)
+
+    def _encode(self, spec: dict, storage: np.dtype, series: pd.Series) -> np.ndarray:
+        if spec["kind"] == "likert":
+            return likert_to_sentinel(series)
+        if spec["kind"] == "numeric":
+            return series.to_numpy(dtype=storage)
+        categorical = (
+            series.array
+            if isinstance(series.dtype, pd.CategoricalDtype)
+            else pd.Categorical(series)
+        )
+        lookup = self._lookups[spec["name"]]
+        # Chunk-local codes -> writer-wide codes; the trailing -1 keeps NaN as -1.
+        mapping = np.array(
+            [lookup.setdefault(str(v), len(lookup)) for v in categorical.categories]
+            + [-1],
+            dtype=np.int32,
+        )
+        return mapping[categorical.codes]
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        if self.specs is None:
+            self.specs, self._storage = [], []
+            for name, series in chunk.items():
+                spec, storage = self._spec(name, series)
+                self.specs.append(spec)
+                self._storage.append(storage)
+        elif list(chunk.columns) != [spec["name"] for spec in self.specs]:
+            raise ValueError("snapshot chunks must share the same columns")
+        for index, spec in enumerate(self.specs):
+            values = self._encode(spec, self._storage[index], chunk.iloc[:, index])
+            with open(self._staging / f"{index}.bin", "ab") as handle:
+                handle.write(np.ascontiguousarray(values).tobytes())
+        self.rows += len(chunk)
+
+    def _finish_column(self, index: int, spec: dict, storage: np.dtype) -> None:
+        raw_path = self._staging / f"{index}.bin"
+        remap, dtype = None, storage
+        if spec["kind"] == "string":
+            lookup = self._lookups[spec["name"]]
+            categories = sorted(lookup)
+            spec["categories"] = categories
+            dtype = _code_dtype(len(categories))
+            remap = np.full(len(lookup) + 1, -1, dtype=dtype)
+            remap[[lookup[v] for v in categories]] = np.arange(len(categories))
+        target = np.lib.format.open_memmap(
+            self._staging / f"{index}.npy", mode="w+", dtype=dtype, shape=(self.rows,)
+        )
+        if self.rows:
+            raw = np.memmap(raw_path, dtype=storage, mode="r", shape=(self.rows,))
+            for start in range(0, self.rows, self.BLOCK_ROWS):
+                block = raw[start : start + self.BLOCK_ROWS]
+                target[start : start + len(block)] = (
+                    block if remap is None else remap[block]
+                )
+            del raw
+        target.flush()
+        del target
+        raw_path.unlink(missing_ok=True)
+
+    def close(self) -> Path:
+        target = snapshot_path(self.source)
+        try:
+            fingerprint = file_fingerprint(self.source, with_hash=True)
+            for index, spec in enumerate(self.specs or []):
+                self._finish_column(index, spec, self._storage[index])
+            _write_meta(
+                self._staging,
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "tag": self.tag,
+                    "source": fingerprint,
+                    "rows": self.rows,
+                    "columns": self.specs or [],
+                },
+            )
+            if target.exists():
+                shutil.rmtree(target, ignore_errors=True)
+            os.replace(self._staging, target)
+        except (OSError, ValueError):
+            self.abort()
+            raise
+        return target
+
+    def abort(self) -> None:
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+
+def write_snapshot(df: pd.DataFrame, source: Path, tag: str | None = None) -> Path:
+    writer = SnapshotWriter(source, tag)
+    try:
+        writer.append(df)
+    except (OSError, ValueError):
+        writer.abort()
+        raise
+    return writer.close()
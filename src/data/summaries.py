@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+BOX_SAMPLE_POINTS = 30
+BOX_MAX_OUTLIERS = 30
+BOX_WHISKER = 1.5
+
+
+def box_summary(
+    df: pd.DataFrame | None,
+    keys: list[str],
+    value: str,
+    sample: int = BOX_SAMPLE_POINTS,
+    max_outliers: int = BOX_MAX_OUTLIERS,
+    seed: int = 0,
+) -> dict | None:
+    if df is None or df.empty:
+        return None
+    frame = df[keys + [value]].dropna(subset=[value])
+    if frame.empty:
+        return None
+    grouped = frame.groupby(keys, observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    values = frame[value].to_numpy(dtype=float)
+
+    # Linear-interpolated quartiles match plotly's default quartilemethod.
+    stats = grouped[value].quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    q1 = stats["q1"].to_numpy()
+    q3 = stats["q3"].to_numpy()
+    iqr = q3 - q1
+    inside = (values >= (q1 - BOX_WHISKER * iqr)[codes]) & (
+        values <= (q3 + BOX_WHISKER * iqr)[codes]
+    )
+    lower = np.full(len(stats), np.inf)
+    upper = np.full(len(stats), -np.inf)
+    np.minimum.at(lower, codes[inside], values[inside])
+    np.maximum.at(upper, codes[inside], values[inside])
+    stats["lowerfence"] = lower
+    stats["upperfence"] = upper
+    stats["n"] = np.bincount(codes, minlength=len(stats))
+
+    # Outliers are deduplicated and capped at the most extreme values per box;
+    # the jitter sample is a seeded per-box draw of the points inside the fences.
+    median = stats["median"].to_numpy()[codes]
+    outliers = (
+        frame[~inside]
+        .assign(_distance=np.abs(values - median)[~inside])
+        .drop_duplicates(keys + [value])
+        .sort_values("_distance", ascending=False, kind="stable")
+        .groupby(keys, observed=True)
+        .head(max_outliers)
+        .drop(columns="_distance")
+    )
+    points = [outliers]
+    if sample:
+        order = np.random.default_rng(seed).permutation(int(inside.sum()))
+        points.append(
+            frame[inside].iloc[order].groupby(keys, observed=True).head(sample)
+        )
+    return {
+        "stats": stats.reset_index(),
+        "points": pd.concat(points, ignore_index=True),
+    }
+
+
+def _ranked(
+    values: np.ndarray, cumulative: np.ndarray, ranks: np.ndarray
+) -> np.ndarray:
+    return values[np.searchsorted(cumulative, ranks, side="right")]
+
+
+def box_summary_from_counts(
+    counts: pd.DataFrame | None,
+    keys: list[str],
+    value: str,
+    sample: int = BOX_SAMPLE_POINTS,
+    max_outliers: int = BOX_MAX_OUTLIERS,
+    seed: int = 0,
+) -> dict | None:
+    # Same output as box_summary, computed from (keys, value, count) rows
+    # sorted by keys then value, so the cost follows distinct values, not rows.
+    if counts is None or counts.empty:
+        return None
+    values = counts[value].to_numpy(dtype=float)
+    weights = counts["count"].to_numpy()
+    changed = np.zeros(len(counts) - 1, dtype=bool)
+    for key in keys:
+        column = counts[key].to_numpy()
+        changed |= column[1:] != column[:-1]
+    bounds = np.r_[0, np.flatnonzero(changed) + 1, len(counts)]
+    codes = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+    cumulative = np.cumsum(weights)
+    starts = cumulative[bounds[:-1]] - weights[bounds[:-1]]
+    n = cumulative[bounds[1:] - 1] - starts
+
+    stats = {key: counts[key].iloc[bounds[:-1]].to_numpy() for key in keys}
+    for name, q in (("q1", 0.25), ("median", 0.5), ("q3", 0.75)):
+        # Linear interpolation between order statistics, as quantile() does.
+        position = (n - 1) * q
+        lower = np.floor(position).astype(np.int64)
+        low = _ranked(values, cumulative, starts + lower)
+        high = _ranked(values, cumulative, starts + np.minimum(lower + 1, n - 1))
+        stats[name] = low + (position - lower) * (high - low)
+    iqr = stats["q3"] - stats["q1"]
+    inside = (values >= (stats["q1"] - BOX_WHISKER * iqr)[codes]) & (
+        values <= (stats["q3"] + BOX_WHISKER * iqr)[codes]
+    )
+    lower = np.full(len(n), np.inf)
+    upper = np.full(len(n), -np.inf)
+    np.minimum.at(lower, codes[inside], values[inside])
+    np.maximum.at(upper, codes[inside], values[inside])
+    stats["lowerfence"] = lower
+    stats["upperfence"] = upper
+    stats["n"] = n
+
+    # Each distinct outlying value is one point already; the jitter sample
+    # draws per box without replacement from the counts inside the fences.
+    outside = np.flatnonzero(~inside)
+    distance = np.abs(values - stats["median"][codes])[outside]
+    outside = outside[np.lexsort((-distance, codes[outside]))]
+    rank = np.arange(len(outside)) - np.searchsorted(
+        codes[outside], codes[outside], side="left"
+    )
+    repeats = np.zeros(len(counts), dtype=np.int64)
+    repeats[outside[rank < max_outliers]] = 1
+    if sample:
+        rng = np.random.default_rng(seed)
+        available = np.where(inside, weights, 0)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            box = available[start:end]
+            repeats[start:end] += rng.multivariate_hypergeometric(
+                box, min(sample, int(box.sum()))
+            )
+    points = counts[keys + [value]].iloc[np.repeat(np.arange(len(counts)), repeats)]
+    return {
+        "stats": pd.DataFrame(stats),
+        "points": points.reset_index(drop=True),
+    }
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.ingest import DEFAULT_CHUNKSIZE, write_cleaned
+from src.data.loader import DEFAULT_DATA_PATH, load_data
+from src.data.schema import apply_schema
+from src.data.transforms import SUPPORT_MAP, TIME_COLUMNS
+
+
+# Parent combinations seen fewer times than this are sampled from the column's
+# marginal instead, so rare respondent profiles are never reproduced.
+MIN_CELL = 5
+
+
+def _chain(columns: list[str], first_parent: str) -> dict:
+    parents = {}
+    for column in columns:
+        parents[column] = first_parent
+        first_parent = column
+    return parents
+
+
+# Every column is drawn conditionally on one parent column, so each pairwise
+# joint on these edges is preserved without copying whole respondent rows.
+PARENTS = {
+    "location": "org_size",
+    "industry": "org_size",
+    "industry_detailed": "industry",
+    "occupation": "industry",
+    "occupation_detailed": "occupation",
+    "birth_year": "gender",
+    "manager": "org_size",
+    "household": "birth_year",
+    "jobtenure": "birth_year",
+    "remote_work_pct_last_year": "industry",
+    "remote_work_pref_pct_last_year": "remote_work_pct_last_year",
+    "remote_work_pct_last_3_months": "remote_work_pct_last_year",
+    "remote_work_pref_pct_last_3_months": "remote_work_pct_last_3_months",
+    "remote_work_pref_pct_future": "remote_work_pref_pct_last_3_months",
+    "remote_productivity_relative": "remote_work_pct_last_3_months",
+    **_chain(list(SUPPORT_MAP), "remote_work_pct_last_3_months"),
+    **_chain(
+        [col for col, (work_type, _) in TIME_COLUMNS.items() if work_type == "Onsite"],
+        "location",
+    ),
+    **{
+        remote: onsite
+        for remote, (remote_type, activity) in TIME_COLUMNS.items()
+        for onsite, (onsite_type, onsite_activity) in TIME_COLUMNS.items()
+        if remote_type == "Remote"
+        and onsite_type == "Onsite"
+        and activity == onsite_activity
+    },
+}
+
+
+class ColumnModel:
+    def __init__(self, values, has_na: bool, parent: str | None, cdf: np.ndarray):
+        self.values = values
+        self.has_na = has_na
+        self.parent = parent
+        self.cdf = cdf
+
+    @property
+    def slots(self) -> int:
+        return self.cdf.shape[1]
+
+    def sample_codes(self, rng, size: int, parent_codes: np.ndarray | None) -> np.ndarray:
+        u = rng.random(size)
+        if parent_codes is None or self.cdf.shape[0] == 1:
+            return np.searchsorted(self.cdf[0], u, side="right")
+        # Offset each parent's CDF by its code so one searchsorted covers every
+        # conditional distribution at once.
+        flat = (self.cdf + np.arange(self.cdf.shape[0])[:, None]).ravel()
+        positions = np.searchsorted(flat, parent_codes + u, side="right")
+        return positions - parent_codes * self.slots
+
+    def materialize(self, codes: np.ndarray):
+        if self.has_na:
+            codes = np.where(codes == len(self.values), -1, codes)
+        return self.values.take(codes, allow_fill=self.has_na)
+
+
+class SurveyModel:
+    def __init__(self, columns: list[str], models: dict, order: list[str]):
+        self.columns = columns
+        self.models = models
+        self.order = order
+
+    @classmethod
+    def fit(
+        cls, df: pd.DataFrame, parents: dict | None = None, min_cell: int = MIN_CELL
+    ) -> "SurveyModel":
+        parents = PARENTS if parents is None else parents
+        order = []
+        for column in df.columns:
+            chain = []
+            while column in df.columns and column not in order and column not in chain:
+                chain.append(column)
+                column = parents.get(column)
+            order.extend(reversed(chain))
+
+        models, codes = {}, {}
+        for column in order:
+            if column == "response_id":
+                continue
+            column_codes, values = pd.factorize(df[column], sort=True)
+            has_na = bool((column_codes < 0).any())
+            slots = len(values) + has_na
+            column_codes = np.where(column_codes < 0, len(values), column_codes)
+            marginal = np.bincount(column_codes, minlength=slots)[None, :]
+            parent = parents.get(column)
+            if parent in models:
+                counts = np.zeros((models[parent].slots, slots), dtype=np.int64)
+                np.add.at(counts, (codes[parent], column_codes), 1)
+                rare = counts.sum(axis=1) < min_cell
+                counts[rare] = marginal
+            else:
+                parent, counts = None, marginal
+            # Integer cumsums keep the final CDF value exactly 1.0.
+            cdf = np.cumsum(counts, axis=1) / counts.sum(axis=1, keepdims=True)
+            models[column] = ColumnModel(values.array, has_na, parent, cdf)
+            codes[column] = column_codes
+        return cls(list(df.columns), models, [c for c in order if c in models])
+
+    def sample(self, size: int, rng=None, first_id: int = 1) -> pd.DataFrame:
+        rng = rng if rng is not None else np.random.default_rng()
+        codes, columns = {}, {}
+        for column in self.order:
+            model = self.models[column]
+            parent_codes = codes.get(model.parent)
+            codes[column] = model.sample_codes(rng, size, parent_codes)
+            columns[column] = model.materialize(codes[column])
+        if "response_id" in self.columns:
+            columns["response_id"] = np.arange(first_id, first_id + size)
+        return apply_schema(pd.DataFrame({col: columns[col] for col in self.columns}))
+
+
+def generate_chunks(model: SurveyModel, rows: int, chunksize: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        yield model.sample(min(chunksize, rows - start), rng, first_id=start + 1)
+
+
+def generate(
+    model: SurveyModel,
+    rows: int,
+    out_path: Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    seed: int = 0,
+) -> int:
+    return write_cleaned(generate_chunks(model, rows, chunksize, seed), out_path)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic cleaned survey learned from a cleaned wave."
+    )
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--source", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-cell", type=int, default=MIN_CELL)
+    args = parser.parse_args(argv)
+
+    model = SurveyModel.fit(load_data(args.source), min_cell=args.min_cell)
+    rows = generate(model, args.rows, args.out, args.chunksize, args.seed)
+    print(f"{args.source.name}: {rows:,} synthetic rows -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
+import time
+from collections.abc import Mapping
+from threading import Lock, Thread
+
+import numpy as np
 import pandas as pd
 
+from src.data.cube import build_cube
+from src.data.sketches import ValueHistogram
+
 
 SURVEY_YEAR = 2020
 
@@ -16,6 +24,18 @@ PERIOD_MAP = {
 
 PERIOD_ORDER = ["Pre-COVID", "During-COVID", "Future Preference"]
 
+GAP_INPUTS = {
+    "gap_precovid": ("remote_work_pref_pct_last_year", "remote_work_pct_last_year"),
+    "gap_covid": (
+        "remote_work_pref_pct_last_3_months",
+        "remote_work_pct_last_3_months",
+    ),
+    "gap_future_vs_recent": (
+        "remote_work_pref_pct_future",
+        "remote_work_pct_last_3_months",
+    ),
+}
+
 SUPPORT_MAP = {
     "remote_last_year_org_encouraged_agreement": ("Last Year", "Encouraged"),
     "remote_last_year_org_prepared_agreement": ("Last Year", "Prepared"),
@@ -55,108 +75,250 @@ TIME_COLUMNS = {
 }
 
 
-def build_derived_tables(df: pd.DataFrame) -> dict:
-    base = df.copy()
+def row_offsets(rows: np.ndarray, size: int) -> np.ndarray:
+    counts = np.bincount(rows, minlength=size)
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def gather_rows(offsets: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    starts = offsets[positions]
+    lengths = offsets[positions + 1] - starts
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) + np.repeat(
+        starts - (ends - lengths), lengths
+    )
+
+
+def select_long(
+    table: pd.DataFrame | None, offsets: np.ndarray, positions: np.ndarray | None
+) -> pd.DataFrame | None:
+    if table is None or positions is None:
+        return table
+    return table.iloc[gather_rows(offsets, positions)]
+
+
+def _label_codes(labels: list[str], cols: np.ndarray) -> pd.Categorical:
+    # Sorted categories group in the same order the string labels did.
+    categories = sorted(set(labels))
+    codes = np.array([categories.index(label) for label in labels], dtype=np.int8)
+    return pd.Categorical.from_codes(codes[cols], categories=categories)
+
+
+def stack_long(
+    base: pd.DataFrame,
+    values: dict[str, pd.Series],
+    value_name: str,
+    labels: dict[str, list[str]],
+    ids: list[str] | None = None,
+):
+    # The value columns are laid side by side and read row-major, so the
+    # stacked cells come out grouped by respondent in column order and the
+    # row offsets need no sort.
+    columns = list(values)
+    present = np.column_stack([values[col].notna().to_numpy() for col in columns])
+    rows, cols = np.nonzero(present)
+
+    dtypes = {values[col].dtype for col in columns}
+    dtype = dtypes.pop() if len(dtypes) == 1 else np.result_type(*dtypes)
+    numpy_dtype = np.dtype(getattr(dtype, "numpy_dtype", dtype))
+    fill = np.nan if numpy_dtype.kind == "f" else 0
+    matrix = np.column_stack(
+        [values[col].to_numpy(dtype=numpy_dtype, na_value=fill) for col in columns]
+    )
+
+    table = pd.DataFrame(
+        {col: base[col].array.take(rows) for col in ["response_id", *(ids or [])]}
+    )
+    table.insert(1, "row", rows)
+    for name, column_labels in labels.items():
+        table[name] = _label_codes(column_labels, cols)
+    table[value_name] = pd.array(matrix[rows, cols], dtype=dtype)
+    return table, row_offsets(rows, len(base))
+
+
+def build_base(df: pd.DataFrame) -> pd.DataFrame:
+    base = df.reset_index(drop=True)
     if "response_id" not in base.columns:
         base["response_id"] = base.index.astype(str)
 
     if "birth_year" in base.columns:
-        base["age"] = SURVEY_YEAR - pd.to_numeric(base["birth_year"], errors="coerce")
+        survey_year = (
+            base["survey_year"] if "survey_year" in base.columns else SURVEY_YEAR
+        )
+        base["age"] = survey_year - pd.to_numeric(base["birth_year"], errors="coerce")
         base["age_group"] = pd.cut(
             base["age"],
             bins=AGE_BINS,
             labels=AGE_LABELS,
             right=False,
         )
+    return base
 
-    remote_cols = [c for c in PERIOD_MAP if c in base.columns]
-    remote_long = None
-    if remote_cols:
-        remote_long = (
-            base[
-                [
-                    "response_id",
-                    "age_group",
-                    "gender",
-                    "org_size",
-                    "industry",
-                ]
-                + remote_cols
-            ]
-            .dropna(subset=remote_cols)
-            .melt(
-                id_vars=["response_id", "age_group", "gender", "org_size", "industry"],
-                value_vars=remote_cols,
-                var_name="period",
-                value_name="remote_pct",
-            )
-        )
-        remote_long["period"] = remote_long["period"].map(PERIOD_MAP)
-
-    gap_df = None
-    if all(
-        col in base.columns
-        for col in [
-            "remote_work_pct_last_year",
-            "remote_work_pref_pct_last_year",
-            "remote_work_pct_last_3_months",
-            "remote_work_pref_pct_last_3_months",
-            "remote_work_pref_pct_future",
-        ]
-    ):
-        gap_base = base[
-            [
-                "response_id",
-                "remote_work_pct_last_year",
-                "remote_work_pref_pct_last_year",
-                "remote_work_pct_last_3_months",
-                "remote_work_pref_pct_last_3_months",
-                "remote_work_pref_pct_future",
-            ]
-        ].dropna()
-        gap_base["gap_precovid"] = (
-            gap_base["remote_work_pref_pct_last_year"]
-            - gap_base["remote_work_pct_last_year"]
-        )
-        gap_base["gap_covid"] = (
-            gap_base["remote_work_pref_pct_last_3_months"]
-            - gap_base["remote_work_pct_last_3_months"]
-        )
-        gap_base["gap_future_vs_recent"] = (
-            gap_base["remote_work_pref_pct_future"]
-            - gap_base["remote_work_pct_last_3_months"]
-        )
-        gap_df = gap_base.melt(
-            id_vars=["response_id"],
-            value_vars=["gap_precovid", "gap_covid", "gap_future_vs_recent"],
-            var_name="period_gap",
-            value_name="gap",
-        )
 
-    support_frames = []
-    for col, (period, question) in SUPPORT_MAP.items():
-        if col in base.columns:
-            frame = base[["response_id", col]].dropna().rename(columns={col: "score"})
-            frame["period"] = period
-            frame["question"] = question
-            support_frames.append(frame)
-    org_support_long = (
-        pd.concat(support_frames, ignore_index=True) if support_frames else None
+def build_remote_long(base: pd.DataFrame):
+    remote_cols = [c for c in PERIOD_MAP if c in base.columns]
+    if not remote_cols:
+        return None, None
+    return stack_long(
+        base,
+        {col: base[col] for col in remote_cols},
+        "remote_pct",
+        {"period": [PERIOD_MAP[col] for col in remote_cols]},
+        ids=["age_group", "gender", "org_size", "industry"],
     )
 
-    time_frames = []
-    for col, (work_type, activity) in TIME_COLUMNS.items():
-        if col in base.columns:
-            frame = base[["response_id", col]].dropna().rename(columns={col: "hours"})
-            frame["work_type"] = work_type
-            frame["activity"] = activity
-            time_frames.append(frame)
-    time_long = pd.concat(time_frames, ignore_index=True) if time_frames else None
-
-    return {
-        "base": base,
-        "remote_long": remote_long,
-        "gap_df": gap_df,
-        "org_support_long": org_support_long,
-        "time_long": time_long,
+
+def build_gap_df(base: pd.DataFrame):
+    # Each gap needs only its own two answers; a wave that skipped one
+    # question still contributes its other gaps.
+    gaps = {
+        name: base[preferred] - base[actual]
+        for name, (preferred, actual) in GAP_INPUTS.items()
+        if preferred in base.columns and actual in base.columns
     }
+    if not gaps:
+        return None, None
+    return stack_long(base, gaps, "gap", {"period_gap": list(gaps)})
+
+
+def build_org_support_long(base: pd.DataFrame):
+    support_cols = [c for c in SUPPORT_MAP if c in base.columns]
+    if not support_cols:
+        return None, None
+    return stack_long(
+        base,
+        {col: base[col] for col in support_cols},
+        "score",
+        {
+            "period": [SUPPORT_MAP[col][0] for col in support_cols],
+            "question": [SUPPORT_MAP[col][1] for col in support_cols],
+        },
+    )
+
+
+def build_time_long(base: pd.DataFrame):
+    time_cols = [c for c in TIME_COLUMNS if c in base.columns]
+    if not time_cols:
+        return None, None
+    return stack_long(
+        base,
+        {col: base[col] for col in time_cols},
+        "hours",
+        {
+            "work_type": [TIME_COLUMNS[col][0] for col in time_cols],
+            "activity": [TIME_COLUMNS[col][1] for col in time_cols],
+        },
+    )
+
+
+LONG_TABLE_BUILDERS = {
+    "remote_long": build_remote_long,
+    "gap_df": build_gap_df,
+    "org_support_long": build_org_support_long,
+    "time_long": build_time_long,
+}
+
+
+# Long tables whose box statistics are served from per-cell histograms:
+# table -> (labels kept alongside the filter fields, value column).
+HISTOGRAMS = {
+    "remote_long": (["period"], "remote_pct"),
+    "gap_df": (["period_gap"], "gap"),
+}
+
+
+def build_histograms(tables: Mapping) -> dict:
+    histograms = {}
+    for name, (labels, value) in HISTOGRAMS.items():
+        table = tables[name]
+        histograms[name] = (
+            None
+            if table is None
+            else ValueHistogram(table, tables["base"], labels, value)
+        )
+    return histograms
+
+
+class _RowOffsets(Mapping):
+    def __init__(self, tables: "DerivedTables"):
+        self._tables = tables
+
+    def __getitem__(self, name: str) -> np.ndarray | None:
+        self._tables[name]
+        return self._tables._offsets[name]
+
+    def __iter__(self):
+        return iter(LONG_TABLE_BUILDERS)
+
+    def __len__(self) -> int:
+        return len(LONG_TABLE_BUILDERS)
+
+
+class DerivedTables(Mapping):
+    def __init__(self, df: pd.DataFrame):
+        self._source = df
+        self._tables = {}
+        self._offsets = {}
+        self._locks = {name: Lock() for name in self.names()}
+        self.build_times = {}
+        self._warm_thread = None
+
+    @staticmethod
+    def names() -> list[str]:
+        return ["base", *LONG_TABLE_BUILDERS, "cube", "histograms", "row_offsets"]
+
+    def _build(self, name: str):
+        if name == "base":
+            return build_base(self._source)
+        if name == "cube":
+            return build_cube(self["base"])
+        if name == "histograms":
+            return build_histograms(self)
+        if name == "row_offsets":
+            return _RowOffsets(self)
+        table, offsets = LONG_TABLE_BUILDERS[name](self["base"])
+        self._offsets[name] = offsets
+        return table
+
+    def __getitem__(self, name: str):
+        if name not in self._locks:
+            raise KeyError(name)
+        if name in self._tables:
+            return self._tables[name]
+        with self._locks[name]:
+            if name not in self._tables:
+                start = time.perf_counter()
+                table = self._build(name)
+                self.build_times[name] = time.perf_counter() - start
+                self._tables[name] = table
+        return self._tables[name]
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def is_built(self, name: str) -> bool:
+        return name in self._tables
+
+    def warm(self, names: list[str] | None = None) -> None:
+        for name in names or self.names():
+            self[name]
+
+    def warm_in_background(self, names: list[str] | None = None) -> Thread:
+        if self._warm_thread is None:
+            self._warm_thread = Thread(
+                target=self.warm, args=(names,), name="derived-warmup", daemon=True
+            )
+            self._warm_thread.start()
+        return self._warm_thread
+
+
+def build_derived_tables(df: pd.DataFrame, lazy: bool = False) -> DerivedTables:
+    derived = DerivedTables(df)
+    if not lazy:
+        derived.warm()
+    return derived
@@ -0,0 +1,149 @@
+import io
+import json
+from urllib.parse import urlencode
+
+from flask import Response, abort, request
+
+from src.data.filters import canonical_filters
+from src.data.transforms import select_long
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+EXPORT_TABLES = {
+    "base": "Respondents",
+    "remote_long": "Remote work %",
+    "gap_df": "Preference gaps",
+    "org_support_long": "Org support",
+    "time_long": "Time allocation",
+}
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# response_id restarts in every wave, so exported rows lead with both keys.
+EXPORT_KEYS = ["survey_year", "response_id"]
+
+# Respondents per chunk; a long table chunk holds all of their rows.
+EXPORT_CHUNK_ROWS = 10_000
+
+
+def export_formats() -> list[str]:
+    return ["csv"] if pq is None else ["csv", "parquet"]
+
+
+def export_url(table: str, fmt: str, filters: dict | None) -> str:
+    canonical = canonical_filters(filters)
+    query = f"?{urlencode({'filters': json.dumps(canonical)})}" if canonical else ""
+    return f"/export/{table}.{fmt}{query}"
+
+
+def export_chunks(
+    derived, positions, table: str, chunk_rows: int = EXPORT_CHUNK_ROWS
+):
+    # Always yields at least one (possibly empty) chunk so the header or
+    # schema is written for an empty selection too.
+    frame = derived[table]
+    base = derived["base"]
+    keys = [col for col in EXPORT_KEYS if col in base.columns]
+    columns = keys + [col for col in frame.columns if col not in keys and col != "row"]
+
+    def keyed(chunk):
+        if "survey_year" in keys and "survey_year" not in chunk.columns:
+            chunk = chunk.assign(
+                survey_year=base["survey_year"].array.take(chunk["row"].to_numpy())
+            )
+        return chunk[columns]
+
+    if positions is None:
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            yield keyed(frame.iloc[start : start + chunk_rows])
+        return
+    offsets = None if table == "base" else derived["row_offsets"][table]
+    for start in range(0, max(len(positions), 1), chunk_rows):
+        chunk = positions[start : start + chunk_rows]
+        yield keyed(
+            frame.iloc[chunk] if offsets is None else select_long(frame, offsets, chunk)
+        )
+
+
+def csv_stream(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header)
+        header = False
+
+
+class _ParquetSink(io.RawIOBase):
+    # Hands each written row group to the response and keeps only a running
+    # offset, which is all the writer needs for the footer.
+    def __init__(self):
+        self.parts = []
+        self.offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def parquet_stream(chunks):
+    sink = _ParquetSink()
+    writer = schema = None
+    for chunk in chunks:
+        if writer is None:
+            # Typed from an empty slice: converting real rows would copy every
+            # categorical column in full just to read its type.
+            schema = pa.Schema.from_pandas(chunk.iloc[:0], preserve_index=False)
+            writer = pq.ParquetWriter(sink, schema)
+        writer.write_table(
+            pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        )
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def register_export(
+    server, derived, selections, chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> None:
+    def export(table, fmt):
+        if table not in EXPORT_TABLES or fmt not in export_formats():
+            abort(404)
+        try:
+            filters = json.loads(request.args.get("filters") or "{}")
+        except ValueError:
+            abort(400)
+        if not isinstance(filters, dict):
+            abort(400)
+        positions = selections.resolve(canonical_filters(filters))
+        if derived[table] is None:
+            abort(404)
+        chunks = export_chunks(derived, positions, table, chunk_rows)
+        body = csv_stream(chunks) if fmt == "csv" else parquet_stream(chunks)
+        return Response(
+            body,
+            content_type=EXPORT_MEDIA_TYPES[fmt],
+            headers={
+                "Content-Disposition": f'attachment; filename="survey_{table}.{fmt}"'
+            },
+        )
+
+    server.add_url_rule("/export/<table>.<any(csv, parquet):fmt>", "export", export)
@@ -0,0 +1,292 @@
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from threading import Lock, local
+
+from flask import Response, g, has_request_context, request
+
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+ROW_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BYTE_BUCKETS = (1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = {labels: (list(c), s) for labels, (c, s) in self._series.items()}
+        lines = []
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = dict(self._values)
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(snapshot.items())
+        ]
+
+
+class Collected:
+    # Values read from their owner at scrape time, for state another object
+    # already keeps count of.
+    def __init__(self, name: str, help: str, kind: str, labelnames: tuple, collect):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self.collect().items())
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.add(
+    Histogram(
+        "dash_callback_stage_seconds",
+        "Time spent in each stage of an instrumented callback.",
+        ("callback", "stage"),
+        LATENCY_BUCKETS,
+    )
+)
+FILTERED_ROWS = REGISTRY.add(
+    Histogram(
+        "dash_callback_filtered_rows",
+        "Respondent rows selected by the filters a callback rendered.",
+        ("callback",),
+        ROW_BUCKETS,
+    )
+)
+PAYLOAD_BYTES = REGISTRY.add(
+    Histogram(
+        "dash_callback_payload_bytes",
+        "Size of the callback response body sent to the browser.",
+        ("callback",),
+        BYTE_BUCKETS,
+    )
+)
+ERRORS = REGISTRY.add(
+    Counter(
+        "dash_callback_errors_total",
+        "Page callbacks that raised.",
+        ("callback",),
+    )
+)
+
+_current = local()
+
+
+@contextmanager
+def stage(name: str):
+    callback = getattr(_current, "callback", None)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if callback is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - start, callback, name)
+
+
+def observe_rows(count: int) -> None:
+    callback = getattr(_current, "callback", None)
+    if callback is not None:
+        FILTERED_ROWS.observe(count, callback)
+
+
+def instrument(name: str):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _current.callback = name
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                ERRORS.inc(name)
+                raise
+            finally:
+                end = time.perf_counter()
+                STAGE_SECONDS.observe(end - start, name, "callback")
+                _current.callback = None
+                if has_request_context():
+                    g.metrics_callback = name
+                    g.metrics_callback_end = end
+
+        return wrapper
+
+    return decorate
+
+
+def register_metrics(server, path: str = "/metrics") -> None:
+    @server.after_request
+    def record_response(response):
+        name = getattr(g, "metrics_callback", None)
+        if name is not None and request.path.endswith("_dash-update-component"):
+            # Dash serializes the outputs after the callback returns.
+            STAGE_SECONDS.observe(
+                time.perf_counter() - g.metrics_callback_end, name, "serialize"
+            )
+            size = response.calculate_content_length()
+            PAYLOAD_BYTES.observe(
+                size if size is not None else len(response.get_data()), name
+            )
+        return response
+
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    server.add_url_rule(path, "metrics", metrics)
+
+
+def register_cache_metrics(cache, registry: Registry = REGISTRY) -> None:
+    registry.add(
+        Collected(
+            "aggregate_cache_lookups_total",
+            "Aggregate cache lookups by where they were answered.",
+            "counter",
+            ("result",),
+            lambda: {
+                (result,): cache.stats()[field]
+                for result, field in (
+                    ("memory", "hits"),
+                    ("disk", "disk_hits"),
+                    ("miss", "misses"),
+                )
+            },
+        )
+    )
+    registry.add(
+        Collected(
+            "aggregate_cache_evictions_total",
+            "Entries evicted from the in-memory aggregate cache.",
+            "counter",
+            (),
+            lambda: {(): cache.stats()["evictions"]},
+        )
+    )
+    registry.add(
+        Collected(
+            "aggregate_cache_bytes",
+            "Estimated size of the aggregate cache by tier.",
+            "gauge",
+            ("tier",),
+            lambda: {
+                ("memory",): cache.stats()["bytes"],
+                ("disk",): cache.stats()["disk_bytes"],
+            },
+        )
+    )
+    registry.add(
+        Collected(
+            "aggregate_cache_entries",
+            "Entries held in the in-memory aggregate cache.",
+            "gauge",
+            (),
+            lambda: {(): cache.stats()["entries"]},
+        )
+    )
+
+
+def register_table_metrics(derived, registry: Registry = REGISTRY) -> None:
+    registry.add(
+        Collected(
+            "derived_table_built",
+            "Whether each derived table has been built yet.",
+            "gauge",
+            ("table",),
+            lambda: {(name,): int(derived.is_built(name)) for name in derived.names()},
+        )
+    )
+    registry.add(
+        Collected(
+            "derived_table_build_seconds",
+            "Time taken to build each derived table.",
+            "gauge",
+            ("table",),
+            lambda: {
+                (name,): seconds for name, seconds in dict(derived.build_times).items()
+            },
+        )
+    )
@@ -0,0 +1,14 @@
+from src.metrics import observe_rows, stage
+
+
+def cached_render(cache, page: str, selections, selection: dict | None, render):
+    # The row count is recorded before the lookup so cached renders, the most
+    # common requests, still show up in the metrics.
+    filters = (selection or {}).get("filters")
+    observe_rows(selections.count(selection))
+    with stage("cache"):
+        found, value = cache.get(f"{page}:render", filters)
+    if not found:
+        value = render(selection)
+        cache.put(f"{page}:render", filters, value)
+    return value
@@ -2,103 +2,121 @@ from dash import html, dcc, Input, Output
 
 from src.components.charts import (
     age_gender_bar,
+    age_gender_patch,
     industry_treemap,
+    industry_treemap_patch,
     orgsize_location_bar,
+    orgsize_location_patch,
 )
-from src.components.filter_panel import FILTER_IDS
-from src.components.kpi_cards import kpi_row
-from src.data.filters import apply_filters
+from src.components.filter_panel import SELECTION_STORE_ID
+from src.components.kpi_cards import interval_note, kpi_row
+from src.components.progress import background_options, progress_bar
+from src.data.sampling import choose_source, median_interval
+from src.metrics import instrument, stage
+from src.pages import cached_render
 
 
-def layout() -> html.Div:
+def layout(derived) -> html.Div:
+    cube = derived["cube"]
     return html.Div(
         className="page",
         children=[
+            progress_bar("demographics-progress"),
             html.Div(id="demographics-kpis"),
-            dcc.Graph(id="demographics-age-gender"),
-            dcc.Graph(id="demographics-industry-tree"),
-            dcc.Graph(id="demographics-orgsize-location"),
+            dcc.Graph(
+                id="demographics-age-gender", figure=age_gender_bar(cube.domain("gender"))
+            ),
+            dcc.Graph(id="demographics-industry-tree", figure=industry_treemap()),
+            dcc.Graph(
+                id="demographics-orgsize-location",
+                figure=orgsize_location_bar(cube.domain("location")),
+            ),
         ],
     )
 
 
-def register_callbacks(app, raw_df, derived):
-    base_df = derived["base"]
+def register_callbacks(
+    app, raw_df, derived, selections, cache, background=None, sample=None
+):
+    def aggregate(selection):
+        filters = (selection or {}).get("filters")
+        cube = derived["cube"]
+        _, view, fraction = choose_source(derived, selections, sample, selection)
+        filtered = view.frame(selection)
 
-    @app.callback(
-        Output("demographics-kpis", "children"),
-        Output("demographics-age-gender", "figure"),
-        Output("demographics-industry-tree", "figure"),
-        Output("demographics-orgsize-location", "figure"),
-        [
-            Input(FILTER_IDS["gender"], "value"),
-            Input(FILTER_IDS["age_group"], "value"),
-            Input(FILTER_IDS["industry"], "value"),
-            Input(FILTER_IDS["org_size"], "value"),
-            Input(FILTER_IDS["location"], "value"),
-        ],
-    )
-    def update_demographics(gender, age_group, industry, org_size, location):
-        filters = {
-            "gender": gender,
-            "age_group": age_group,
-            "industry": industry,
-            "org_size": org_size,
-            "location": location,
-        }
-        filtered = apply_filters(base_df, filters)
-
-        total = f"{len(filtered):,}"
         median_age = (
             filtered["age"].median() if "age" in filtered.columns else 0
         )
-        top_industry = ""
-        if "industry" in filtered.columns:
-            top_industry = (
-                filtered["industry"].value_counts().index[0]
-                if not filtered["industry"].dropna().empty
-                else ""
-            )
-
-        kpis = kpi_row(
-            [
-                ("Respondents", total),
-                ("Median age", f"{median_age:.0f}"),
-                ("Top industry", top_industry or "N/A"),
-            ]
-        )
-
-        age_gender = (
-            filtered[["age_group", "gender"]]
-            .dropna()
-            .groupby(["age_group", "gender"])
-            .size()
-            .reset_index(name="count")
+        median_age_interval = (
+            median_interval(filtered["age"], fraction)
+            if fraction is not None and "age" in filtered.columns
+            else None
         )
-        industry_counts = (
-            filtered[["industry", "industry_detailed"]]
-            .dropna()
-            .groupby(["industry", "industry_detailed"])
-            .size()
-            .reset_index(name="count")
+        industry_totals = cube.counts_by(["industry"], filters)
+        top_industry = (
+            industry_totals.sort_values("count", ascending=False, kind="stable")
+            .iloc[0]["industry"]
+            if not industry_totals.empty
+            else ""
         )
+
+        industry_counts = cube.counts_by(["industry", "industry_detailed"], filters)
         if not industry_counts.empty:
             industry_counts["percent"] = (
                 industry_counts["count"] / industry_counts["count"].sum() * 100
             )
-        org_loc = (
-            filtered[["org_size", "location"]]
-            .dropna()
-            .groupby(["org_size", "location"])
-            .size()
-            .reset_index(name="count")
-        )
 
-        return (
-            kpis,
-            age_gender_bar(age_gender),
-            industry_treemap(industry_counts),
-            orgsize_location_bar(org_loc),
-        )
+        return {
+            "total": cube.total(filters),
+            "median_age": median_age,
+            "median_age_interval": median_age_interval,
+            "top_industry": top_industry,
+            "age_gender": cube.counts_by(["age_group", "gender"], filters),
+            "industry_counts": industry_counts,
+            "org_loc": cube.counts_by(["org_size", "location"], filters),
+        }
+
+    def render(selection):
+        filters = (selection or {}).get("filters")
+        with stage("aggregate"):
+            data = cache.get_or_compute(
+                "demographics", filters, lambda: aggregate(selection)
+            )
+
+        with stage("render"):
+            kpis = kpi_row(
+                [
+                    ("Respondents", f"{data['total']:,}"),
+                    (
+                        "Median age",
+                        f"{data['median_age']:.0f}",
+                        interval_note(data["median_age_interval"], ".0f"),
+                    ),
+                    ("Top industry", data["top_industry"] or "N/A"),
+                ]
+            )
+
+            cube = derived["cube"]
+            return (
+                kpis,
+                age_gender_patch(data["age_gender"], cube.domain("gender")),
+                industry_treemap_patch(data["industry_counts"]),
+                orgsize_location_patch(data["org_loc"], cube.domain("location")),
+            )
+
+    def rendered(selection):
+        return cached_render(cache, "demographics", selections, selection, render)
+
+    @app.callback(
+        Output("demographics-kpis", "children"),
+        Output("demographics-age-gender", "figure"),
+        Output("demographics-industry-tree", "figure"),
+        Output("demographics-orgsize-location", "figure"),
+        Input(SELECTION_STORE_ID, "data"),
+        **background_options("demographics-progress", background),
+    )
+    @instrument("demographics")
+    def update_demographics(selection):
+        return rendered(selection)
 
-    return None
+    return rendered
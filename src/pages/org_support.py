@@ -1,59 +1,49 @@
 from dash import html, dcc, Input, Output
 
-from src.components.charts import org_support_trends, time_allocation_bar
-from src.components.filter_panel import FILTER_IDS
-from src.components.kpi_cards import kpi_row
-from src.data.filters import apply_filters
+from src.components.charts import (
+    org_support_patch,
+    org_support_trends,
+    time_allocation_bar,
+    time_allocation_patch,
+)
+from src.components.filter_panel import SELECTION_STORE_ID
+from src.components.kpi_cards import interval_note, kpi_number, kpi_row
+from src.components.progress import background_options, progress_bar
+from src.data.sampling import choose_source, linear_interval
+from src.data.transforms import SUPPORT_MAP, TIME_COLUMNS, select_long
+from src.metrics import instrument, stage
+from src.pages import cached_render
 
 
-def layout() -> html.Div:
+QUESTIONS = list(dict.fromkeys(question for _, question in SUPPORT_MAP.values()))
+WORK_TYPES = list(dict.fromkeys(work_type for work_type, _ in TIME_COLUMNS.values()))
+
+
+def layout(derived) -> html.Div:
     return html.Div(
         className="page",
         children=[
+            progress_bar("support-progress"),
             html.Div(id="support-kpis"),
-            dcc.Graph(id="support-trends"),
-            dcc.Graph(id="time-allocation"),
+            dcc.Graph(id="support-trends", figure=org_support_trends(QUESTIONS)),
+            dcc.Graph(id="time-allocation", figure=time_allocation_bar(WORK_TYPES)),
         ],
     )
 
 
-def register_callbacks(app, raw_df, derived):
-    base_df = derived["base"]
-    support_long = derived["org_support_long"]
-    time_long = derived["time_long"]
-
-    @app.callback(
-        Output("support-kpis", "children"),
-        Output("support-trends", "figure"),
-        Output("time-allocation", "figure"),
-        [
-            Input(FILTER_IDS["gender"], "value"),
-            Input(FILTER_IDS["age_group"], "value"),
-            Input(FILTER_IDS["industry"], "value"),
-            Input(FILTER_IDS["org_size"], "value"),
-            Input(FILTER_IDS["location"], "value"),
-        ],
-    )
-    def update_support(gender, age_group, industry, org_size, location):
-        filters = {
-            "gender": gender,
-            "age_group": age_group,
-            "industry": industry,
-            "org_size": org_size,
-            "location": location,
-        }
-        filtered = apply_filters(base_df, filters)
-        ids = set(filtered["response_id"].dropna().tolist())
+def register_callbacks(
+    app, raw_df, derived, selections, cache, background=None, sample=None
+):
+    def aggregate(selection):
+        source, view, fraction = choose_source(derived, selections, sample, selection)
+        offsets = source["row_offsets"]
+        positions = view.positions(selection)
 
-        support_filtered = (
-            support_long[support_long["response_id"].isin(ids)]
-            if support_long is not None
-            else support_long
+        support_filtered = select_long(
+            source["org_support_long"], offsets["org_support_long"], positions
         )
-        time_filtered = (
-            time_long[time_long["response_id"].isin(ids)]
-            if time_long is not None
-            else time_long
+        time_filtered = select_long(
+            source["time_long"], offsets["time_long"], positions
         )
 
         support_summary = (
@@ -91,18 +81,85 @@ def register_callbacks(app, raw_df, derived):
             ]["hours"].mean()
             commute_gap = onsite - remote
 
-        kpis = kpi_row(
-            [
-                ("Avg support last year", f"{support_last_year:.2f}"),
-                ("Avg support last 3 months", f"{support_last_3m:.2f}"),
-                ("Commute hours saved", f"{commute_gap:.2f}"),
-            ]
-        )
+        intervals = {}
+        if fraction is not None and support_summary is not None and not support_summary.empty:
+            for key, period in (
+                ("support_last_year", "Last Year"),
+                ("support_last_3m", "Last 3 Months"),
+            ):
+                questions = support_summary.loc[
+                    support_summary["period"] == period, "question"
+                ].astype(str)
+                intervals[key] = linear_interval(
+                    support_filtered[support_filtered["period"] == period],
+                    "question",
+                    "score",
+                    {question: 1 / len(questions) for question in questions},
+                    fraction,
+                )
+        if fraction is not None and time_filtered is not None and not time_filtered.empty:
+            intervals["commute_gap"] = linear_interval(
+                time_filtered[time_filtered["activity"] == "Commute"],
+                "work_type",
+                "hours",
+                {"Onsite": 1, "Remote": -1},
+                fraction,
+            )
 
-        return (
-            kpis,
-            org_support_trends(support_summary),
-            time_allocation_bar(time_summary),
-        )
+        return {
+            "support_summary": support_summary,
+            "time_summary": time_summary,
+            "support_last_year": support_last_year,
+            "support_last_3m": support_last_3m,
+            "commute_gap": commute_gap,
+            "intervals": intervals,
+        }
+
+    def render(selection):
+        filters = (selection or {}).get("filters")
+        with stage("aggregate"):
+            data = cache.get_or_compute("org_support", filters, lambda: aggregate(selection))
+
+        with stage("render"):
+            intervals = data["intervals"]
+            kpis = kpi_row(
+                [
+                    (
+                        "Avg support last year",
+                        kpi_number(data["support_last_year"], "{:.2f}"),
+                        interval_note(intervals.get("support_last_year"), ".2f"),
+                    ),
+                    (
+                        "Avg support last 3 months",
+                        kpi_number(data["support_last_3m"], "{:.2f}"),
+                        interval_note(intervals.get("support_last_3m"), ".2f"),
+                    ),
+                    (
+                        "Commute hours saved",
+                        kpi_number(data["commute_gap"], "{:.2f}"),
+                        interval_note(intervals.get("commute_gap"), ".2f"),
+                    ),
+                ]
+            )
+
+            return (
+                kpis,
+                org_support_patch(data["support_summary"], QUESTIONS),
+                time_allocation_patch(data["time_summary"], WORK_TYPES),
+            )
+
+    def rendered(selection):
+        return cached_render(cache, "org_support", selections, selection, render)
+
+    @app.callback(
+        Output("support-kpis", "children"),
+        Output("support-trends", "figure"),
+        Output("time-allocation", "figure"),
+        Input(SELECTION_STORE_ID, "data"),
+        **background_options("support-progress", background),
+    )
+    @instrument("org_support")
+    def update_support(selection):
+        return rendered(selection)
 
-    return None
+    return rendered
@@ -2,110 +2,104 @@ from dash import html, dcc, Input, Output
 
 from src.components.charts import (
     age_gender_bar,
+    age_gender_patch,
     industry_treemap,
+    industry_treemap_patch,
     orgsize_location_bar,
+    orgsize_location_patch,
 )
-from src.components.kpi_cards import kpi_row
-from src.components.filter_panel import FILTER_IDS
-from src.data.filters import apply_filters
+from src.components.kpi_cards import kpi_number, kpi_row
+from src.components.progress import background_options, progress_bar
+from src.components.filter_panel import SELECTION_STORE_ID
+from src.metrics import instrument, stage
+from src.pages import cached_render
 
 
-def layout() -> html.Div:
+def layout(derived) -> html.Div:
+    cube = derived["cube"]
     return html.Div(
         className="page",
         children=[
+            progress_bar("overview-progress"),
             html.Div(id="overview-kpis"),
-            dcc.Graph(id="overview-age-gender"),
-            dcc.Graph(id="overview-industry-tree"),
-            dcc.Graph(id="overview-orgsize-location"),
+            dcc.Graph(
+                id="overview-age-gender", figure=age_gender_bar(cube.domain("gender"))
+            ),
+            dcc.Graph(id="overview-industry-tree", figure=industry_treemap()),
+            dcc.Graph(
+                id="overview-orgsize-location",
+                figure=orgsize_location_bar(cube.domain("location")),
+            ),
         ],
     )
 
 
-def register_callbacks(app, raw_df, derived):
-    base_df = derived["base"]
+def register_callbacks(app, raw_df, derived, selections, cache, background=None):
+    def aggregate(selection):
+        filters = (selection or {}).get("filters")
+        cube = derived["cube"]
 
-    @app.callback(
-        Output("overview-kpis", "children"),
-        Output("overview-age-gender", "figure"),
-        Output("overview-industry-tree", "figure"),
-        Output("overview-orgsize-location", "figure"),
-        [
-            Input(FILTER_IDS["gender"], "value"),
-            Input(FILTER_IDS["age_group"], "value"),
-            Input(FILTER_IDS["industry"], "value"),
-            Input(FILTER_IDS["org_size"], "value"),
-            Input(FILTER_IDS["location"], "value"),
-        ],
-    )
-    def update_overview(gender, age_group, industry, org_size, location):
-        filters = {
-            "gender": gender,
-            "age_group": age_group,
-            "industry": industry,
-            "org_size": org_size,
-            "location": location,
+        industry_counts = cube.counts_by(["industry", "industry_detailed"], filters)
+        if not industry_counts.empty:
+            industry_counts["percent"] = (
+                industry_counts["count"] / industry_counts["count"].sum() * 100
+            )
+
+        return {
+            "total": cube.total(filters),
+            "avg_last_year": cube.mean("remote_work_pct_last_year", filters),
+            "avg_last_3m": cube.mean("remote_work_pct_last_3_months", filters),
+            "avg_future": cube.mean("remote_work_pref_pct_future", filters),
+            "age_gender": cube.counts_by(["age_group", "gender"], filters),
+            "industry_counts": industry_counts,
+            "org_loc": cube.counts_by(["org_size", "location"], filters),
         }
-        filtered = apply_filters(base_df, filters)
 
-        total = f"{len(filtered):,}"
-        avg_last_year = (
-            filtered["remote_work_pct_last_year"].mean()
-            if "remote_work_pct_last_year" in filtered.columns
-            else 0
-        )
-        avg_last_3m = (
-            filtered["remote_work_pct_last_3_months"].mean()
-            if "remote_work_pct_last_3_months" in filtered.columns
-            else 0
-        )
-        avg_future = (
-            filtered["remote_work_pref_pct_future"].mean()
-            if "remote_work_pref_pct_future" in filtered.columns
-            else 0
-        )
+    def render(selection):
+        filters = (selection or {}).get("filters")
+        with stage("aggregate"):
+            data = cache.get_or_compute("overview", filters, lambda: aggregate(selection))
 
-        kpis = kpi_row(
-            [
-                ("Respondents", total),
-                ("Avg remote % last year", f"{avg_last_year:.1f}%"),
-                ("Avg remote % last 3 months", f"{avg_last_3m:.1f}%"),
-                ("Avg preferred remote % future", f"{avg_future:.1f}%"),
-            ]
-        )
+        with stage("render"):
+            kpis = kpi_row(
+                [
+                    ("Respondents", f"{data['total']:,}"),
+                    (
+                        "Avg remote % last year",
+                        kpi_number(data["avg_last_year"], "{:.1f}%"),
+                    ),
+                    (
+                        "Avg remote % last 3 months",
+                        kpi_number(data["avg_last_3m"], "{:.1f}%"),
+                    ),
+                    (
+                        "Avg preferred remote % future",
+                        kpi_number(data["avg_future"], "{:.1f}%"),
+                    ),
+                ]
+            )
 
-        age_gender = (
-            filtered[["age_group", "gender"]]
-            .dropna()
-            .groupby(["age_group", "gender"])
-            .size()
-            .reset_index(name="count")
-        )
-        industry_counts = (
-            filtered[["industry", "industry_detailed"]]
-            .dropna()
-            .groupby(["industry", "industry_detailed"])
-            .size()
-            .reset_index(name="count")
-        )
-        if not industry_counts.empty:
-            industry_counts["percent"] = (
-                industry_counts["count"] / industry_counts["count"].sum() * 100
+            cube = derived["cube"]
+            return (
+                kpis,
+                age_gender_patch(data["age_gender"], cube.domain("gender")),
+                industry_treemap_patch(data["industry_counts"]),
+                orgsize_location_patch(data["org_loc"], cube.domain("location")),
             )
 
-        org_loc = (
-            filtered[["org_size", "location"]]
-            .dropna()
-            .groupby(["org_size", "location"])
-            .size()
-            .reset_index(name="count")
-        )
+    def rendered(selection):
+        return cached_render(cache, "overview", selections, selection, render)
 
-        return (
-            kpis,
-            age_gender_bar(age_gender),
-            industry_treemap(industry_counts),
-            orgsize_location_bar(org_loc),
-        )
+    @app.callback(
+        Output("overview-kpis", "children"),
+        Output("overview-age-gender", "figure"),
+        Output("overview-industry-tree", "figure"),
+        Output("overview-orgsize-location", "figure"),
+        Input(SELECTION_STORE_ID, "data"),
+        **background_options("overview-progress", background),
+    )
+    @instrument("overview")
+    def update_overview(selection):
+        return rendered(selection)
 
-    return None
+    return rendered
@@ -1,82 +1,113 @@
 from dash import html, dcc, Input, Output
 
-from src.components.charts import gap_box, remote_pct_box
-from src.components.filter_panel import FILTER_IDS
-from src.components.kpi_cards import kpi_row
-from src.data.filters import apply_filters
+from src.components.charts import (
+    gap_box,
+    gap_patch,
+    remote_pct_box,
+    remote_pct_patch,
+)
+from src.components.filter_panel import SELECTION_STORE_ID
+from src.components.kpi_cards import kpi_number, kpi_row
+from src.components.progress import background_options, progress_bar
+from src.data.summaries import box_summary_from_counts
+from src.data.transforms import PERIOD_ORDER
+from src.metrics import instrument, stage
+from src.pages import cached_render
 
 
-def layout() -> html.Div:
+def layout(derived) -> html.Div:
     return html.Div(
         className="page",
         children=[
+            progress_bar("remote-progress"),
             html.Div(id="remote-kpis"),
-            dcc.Graph(id="remote-by-gender"),
-            dcc.Graph(id="remote-by-orgsize"),
-            dcc.Graph(id="remote-gaps"),
+            dcc.Graph(
+                id="remote-by-gender", figure=remote_pct_box(PERIOD_ORDER, "gender")
+            ),
+            dcc.Graph(
+                id="remote-by-orgsize", figure=remote_pct_box(PERIOD_ORDER, "org_size")
+            ),
+            dcc.Graph(id="remote-gaps", figure=gap_box()),
         ],
     )
 
 
-def register_callbacks(app, raw_df, derived):
-    base_df = derived["base"]
-    remote_long = derived["remote_long"]
-    gap_df = derived["gap_df"]
+def register_callbacks(app, raw_df, derived, selections, cache, background=None):
+    def aggregate(selection):
+        filters = (selection or {}).get("filters")
+        histograms = derived["histograms"]
+
+        def summary(name, keys, value, **options):
+            histogram = histograms[name]
+            return box_summary_from_counts(
+                None if histogram is None else histogram.counts_by(keys, filters),
+                keys,
+                value,
+                **options,
+            )
+
+        gap_summary = summary("gap_df", ["period_gap"], "gap", sample=0)
+        gap_medians = (
+            gap_summary["stats"].set_index("period_gap")["median"].to_dict()
+            if gap_summary is not None
+            else {}
+        )
+        return {
+            "gap_medians": gap_medians,
+            "remote_by_gender": summary(
+                "remote_long", ["gender", "period"], "remote_pct"
+            ),
+            "remote_by_orgsize": summary(
+                "remote_long", ["org_size", "period"], "remote_pct"
+            ),
+            "gap_summary": gap_summary,
+        }
+
+    def render(selection):
+        filters = (selection or {}).get("filters")
+        with stage("aggregate"):
+            data = cache.get_or_compute("remote_work", filters, lambda: aggregate(selection))
+
+        with stage("render"):
+            gap_medians = data["gap_medians"]
+
+            kpis = kpi_row(
+                [
+                    (
+                        "Median gap pre-COVID",
+                        kpi_number(gap_medians.get("gap_precovid"), "{:.1f}%"),
+                    ),
+                    (
+                        "Median gap last 3 months",
+                        kpi_number(gap_medians.get("gap_covid"), "{:.1f}%"),
+                    ),
+                    (
+                        "Median gap future vs recent",
+                        kpi_number(gap_medians.get("gap_future_vs_recent"), "{:.1f}%"),
+                    ),
+                ]
+            )
+
+            return (
+                kpis,
+                remote_pct_patch(data["remote_by_gender"], PERIOD_ORDER, "gender"),
+                remote_pct_patch(data["remote_by_orgsize"], PERIOD_ORDER, "org_size"),
+                gap_patch(data["gap_summary"]),
+            )
+
+    def rendered(selection):
+        return cached_render(cache, "remote_work", selections, selection, render)
 
     @app.callback(
         Output("remote-kpis", "children"),
         Output("remote-by-gender", "figure"),
         Output("remote-by-orgsize", "figure"),
         Output("remote-gaps", "figure"),
-        [
-            Input(FILTER_IDS["gender"], "value"),
-            Input(FILTER_IDS["age_group"], "value"),
-            Input(FILTER_IDS["industry"], "value"),
-            Input(FILTER_IDS["org_size"], "value"),
-            Input(FILTER_IDS["location"], "value"),
-        ],
+        Input(SELECTION_STORE_ID, "data"),
+        **background_options("remote-progress", background),
     )
-    def update_remote(gender, age_group, industry, org_size, location):
-        filters = {
-            "gender": gender,
-            "age_group": age_group,
-            "industry": industry,
-            "org_size": org_size,
-            "location": location,
-        }
-        filtered = apply_filters(base_df, filters)
-        ids = set(filtered["response_id"].dropna().tolist())
-
-        remote_filtered = (
-            remote_long[remote_long["response_id"].isin(ids)]
-            if remote_long is not None
-            else remote_long
-        )
-        gaps_filtered = (
-            gap_df[gap_df["response_id"].isin(ids)] if gap_df is not None else gap_df
-        )
-
-        gap_medians = (
-            gaps_filtered.groupby("period_gap")["gap"].median()
-            if gaps_filtered is not None and not gaps_filtered.empty
-            else {}
-        )
-        kpis = kpi_row(
-            [
-                ("Median gap pre-COVID", f"{gap_medians.get('gap_precovid', 0):.1f}%"),
-                ("Median gap last 3 months", f"{gap_medians.get('gap_covid', 0):.1f}%"),
-                (
-                    "Median gap future vs recent",
-                    f"{gap_medians.get('gap_future_vs_recent', 0):.1f}%",
-                ),
-            ]
-        )
-
-        return (
-            kpis,
-            remote_pct_box(remote_filtered, "gender"),
-            remote_pct_box(remote_filtered, "org_size"),
-            gap_box(gaps_filtered),
-        )
+    @instrument("remote_work")
+    def update_remote(selection):
+        return rendered(selection)
 
-    return None
+    return rendered
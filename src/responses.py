@@ -0,0 +1,29 @@
+import gzip
+
+from flask import request
+
+
+GZIP_LEVEL = 6
+GZIP_MIN_BYTES = 512
+
+
+def register_compression(
+    server, level: int = GZIP_LEVEL, min_bytes: int = GZIP_MIN_BYTES
+) -> None:
+    @server.after_request
+    def compress_response(response):
+        if not request.path.endswith("_dash-update-component"):
+            return response
+        response.vary.add("Accept-Encoding")
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not request.accept_encodings["gzip"]
+        ):
+            return response
+        data = response.get_data()
+        if len(data) >= min_bytes:
+            response.set_data(gzip.compress(data, compresslevel=level))
+            response.headers["Content-Encoding"] = "gzip"
+        return response